@@ -1,25 +1,67 @@
 import streamlit as st
+import contextlib
 import time
 import random
 from datetime import datetime
 
 # Import your existing modules
 try:
-    from frontend.utils.auth import init_session_state, login_user, logout_user, register_user
-    from frontend.utils.database import get_database, initialize_database, is_database_available, get_team_count
-    from frontend.utils.match_simulator import simulate_match_with_commentary
+    from frontend.utils.auth import init_session_state, login_user, logout_user, register_user, start_session, resolve_session, guard_attempt, get_admission_control
+    from frontend.utils.rate_limit import AdmissionRejected
+    from frontend.utils.database import get_database, initialize_database, is_database_available, get_team_count, cached_find, cached_aggregate, invalidate_collections, load_page_data, LIVE_MATCHES, LIVE_FEDERATIONS
+    from frontend.utils.match_simulator import simulate_match_with_commentary, iter_match_with_commentary
+    from frontend.utils.forecaster import build_bracket_state, forecast_tournament
+    from frontend.utils.bracket_solver import exact_forecast
+    from frontend.utils.seeding import new_seed, derive_seed, seeded_rng, match_seed
+    from frontend.utils.match_engine import ENGINE_MODES, simulate_goal_minutes
+    from frontend.utils.squad_index import get_squad_indexes, invalidate_squad
+    from frontend.utils.tournament_runner import play_remaining
+    from pymongo import InsertOne, UpdateOne
+    from bson import ObjectId
+    from backend.stats_projector import apply_match_results, rebuild_stats
+    from backend.player_store import insert_squad, load_squad
+    from frontend.utils import analytics
+    from backend.email_service import queue_match_notifications
 except ImportError as e:
     st.error(f"Import error: {e}")
     # Create dummy functions for testing
     def init_session_state(): pass
     def login_user(*args): return False
     def logout_user(): pass
-    def register_user(*args): return False
+    def register_user(*args): return None
+    def start_session(user): st.session_state.user = user; st.session_state.role = user.get('role', 'visitor')
+    def resolve_session(): return st.session_state.get('user')
+    class AdmissionRejected(Exception): pass
+    def guard_attempt(*args): return contextlib.nullcontext()
+    def get_admission_control(): return None
     def get_database(): return None
     def initialize_database(): pass
     def is_database_available(): return False
     def get_team_count(): return 0
+    def cached_find(collection, query=None, **kwargs): return []
+    def cached_aggregate(collection, pipeline, **kwargs): return []
+    def load_page_data(**loaders): return {name: loader() for name, loader in loaders.items()}
+    def invalidate_collections(*collections): pass
+    LIVE_MATCHES = {"stage": {"$in": ["quarterfinal", "semifinal", "final"]}}; LIVE_FEDERATIONS = {"synthetic": {"$ne": True}}
     def simulate_match_with_commentary(*args): return (0, 0, [], [])
+    def iter_match_with_commentary(*args): return iter(())
+    def build_bracket_state(*args): return None
+    def forecast_tournament(*args, **kwargs): return None
+    def exact_forecast(*args): return None
+    def new_seed(): return random.randrange(2**63)
+    def derive_seed(*args): return new_seed()
+    def seeded_rng(seed): return random.Random(seed)
+    def match_seed(match): return (match or {}).get('seed') or new_seed()
+    ENGINE_MODES = {"classic": "Classic (0-3 goals each)"}
+    def simulate_goal_minutes(mode, rating_a, rating_b, rng=None): return ([], [])
+    def get_squad_indexes(db, countries): return {}
+    def invalidate_squad(country=None): pass
+    def play_remaining(*args): return ({}, [], None)
+    def apply_match_results(*args): return 0
+    def rebuild_stats(db): return 0
+    def insert_squad(*args): return 0
+    def queue_match_notifications(db, matches): return 0
+    def load_squad(db, country, projection=None): return []
 
 # Initialize
 init_session_state()
@@ -60,7 +102,8 @@ st.markdown("""
 def main():
     try:
         initialize_database()
-        if not st.session_state.get('user'):
+        if not is_database_available(): st.warning("⚠️ Database unreachable - showing what we can and reconnecting in the background")
+        if not resolve_session():
             show_login_page()
         else:
             # Set Home as default landing page for all users after login
@@ -93,13 +136,15 @@ def show_login_page():
             email = st.text_input("Email", placeholder="admin@africanleague.com")
             password = st.text_input("Password", type="password")
             if st.form_submit_button("Login as Admin", use_container_width=True):
-                if login_user(email, password):
+                try: logged_in = login_user(email, password)
+                except AdmissionRejected as e: st.error(str(e)); logged_in = None  # rate limited: not a credentials failure
+                if logged_in:
                     st.success("Welcome Admin!")
                     # FIX: Set current_page for admin
                     st.session_state.current_page = "🏠 Home"
                     time.sleep(1)
                     st.rerun()
-                else: 
+                elif logged_in is False: 
                     st.error("Invalid credentials")
     
     with tab2: 
@@ -214,32 +259,38 @@ def show_federation_registration():
         
         else:  # Auto-generate squad
             #st.info("A balanced squad of 23 players will be automatically generated")
-            squad = generate_realistic_squad()
+            squad = None  # generated from a stored seed in register_federation
         
         if st.form_submit_button("Register Federation", use_container_width=True):
             if not squad and player_option == "Add Players Manually":
                 st.error("Please add players to your squad")
-            elif gk_count < 1 and player_option == "Add Players Manually":
+            elif player_option == "Add Players Manually" and gk_count < 1:
                 st.error("Need at least 1 Goalkeeper")
             else:
                 if register_federation(country, manager, rep_name, rep_email, password, squad):
                     st.success("Federation registered successfully!")
-                    if login_user(rep_email, password):
-                        st.session_state.current_page = "🏠 Home"
-                        st.rerun()
 def register_federation(country, manager, rep_name, rep_email, password, custom_squad=None):
+    # Over-limit or over-capacity submits are turned away before any database I/O
+    try:
+        with guard_attempt("register", rep_email): return save_federation(country, manager, rep_name, rep_email, password, custom_squad)
+    except AdmissionRejected as e: st.error(str(e)); return False
+
+def save_federation(country, manager, rep_name, rep_email, password, custom_squad=None):
     try:
         db = get_database()
         if db is None: st.error("Database unavailable"); return False
         existing_team = db.federations.find_one({"country": country})
         if existing_team: st.error("Country already registered"); return False
-        if not register_user(rep_email, password, "federation", country): st.error("Registration failed"); return False
+        user = register_user(rep_email, password, "federation", country)
+        if not user: st.error("Registration failed"); return False
         
-        # Use custom squad if provided, otherwise generate one
+        # Use custom squad if provided, otherwise generate one from a seed we keep
+        squad_seed = None
         if custom_squad:
             squad = custom_squad
         else:
-            squad = generate_realistic_squad()
+            squad_seed = new_seed()
+            squad = generate_realistic_squad(seeded_rng(squad_seed))
             
         team_rating = sum(p["ratings"][p["naturalPosition"]] for p in squad) / len(squad)
         team_data = {
@@ -248,32 +299,35 @@ def register_federation(country, manager, rep_name, rep_email, password, custom_
             "representative_name": rep_name, 
             "representative_email": rep_email, 
             "rating": round(team_rating, 2), 
-            "players": squad, 
+            "squad_seed": squad_seed,
+            "wins": 0, "draws": 0, "losses": 0, "goalsFor": 0, "goalsAgainst": 0, "points": 0,
             "registered_at": datetime.now()
         }
-        db.federations.insert_one(team_data)
+        result = db.federations.insert_one(team_data); insert_squad(db, country, result.inserted_id, squad)
+        invalidate_squad(country); invalidate_collections("federations", "players")
         
         if get_team_count() >= 8:
             initialize_tournament(db)
             st.balloons()
             st.success("🎊 Tournament started with 8 teams!")
         
-        # Set current_page for federation users after registration/login
-        if login_user(rep_email, password):
-            st.session_state.current_page = "🏠 Home"
-            st.rerun()
+        # Sign the new representative in from the identity we just wrote; no second users lookup
+        start_session(user)
+        st.session_state.current_page = "🏠 Home"
+        st.rerun()
         return True
     except Exception as e: 
         st.error(f"Registration error: {str(e)}")
         return False
-def generate_realistic_squad():
+def generate_realistic_squad(rng=None):
+    rng = rng or random
     first_names = ["Mohamed", "Ibrahim", "Ahmed", "Youssef", "Samuel", "David", "Kwame", "Kofi", "Chukwu", "Adebayo", "Musa", "Said", "Rashid", "Tendai", "Blessing", "Prince", "Emmanuel", "Daniel", "Joseph", "Victor"]
     last_names = ["Traore", "Diallo", "Keita", "Camara", "Sow", "Diop", "Ndiaye", "Gueye", "Mensah", "Appiah", "Owusu", "Adeyemi", "Okafor", "Okoro", "Mohammed", "Ali", "Hussein", "Juma", "Kamau", "Nkosi"]
     squad = []; positions = {"GK": 3, "DF": 7, "MD": 8, "AT": 5}
     for pos, count in positions.items():
         for i in range(count):
-            player_name = f"{random.choice(first_names)} {random.choice(last_names)}"
-            player = {"name": player_name, "naturalPosition": pos, "ratings": {p: random.randint(50, 100) if p == pos else random.randint(0, 50) for p in ["GK", "DF", "MD", "AT"]}, "isCaptain": False}
+            player_name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+            player = {"name": player_name, "naturalPosition": pos, "ratings": {p: rng.randint(50, 100) if p == pos else rng.randint(0, 50) for p in ["GK", "DF", "MD", "AT"]}, "isCaptain": False}
             squad.append(player)
     if squad: squad[0]["isCaptain"] = True
     return squad
@@ -309,8 +363,9 @@ def show_home_dashboard():
     
     st.markdown("""<div class="main-header"><h1 style="margin:0; color: #FFD700; font-size: 2.8em;">🏆 WELCOME TO AFRICAN NATIONS LEAGUE 2025</h1><p style="margin:0; font-size: 1.3em; font-weight: bold;">Tournament Dashboard</p></div>""", unsafe_allow_html=True)
     
-    teams = get_federations(); matches = get_matches(); completed_matches = [m for m in matches if m.get('status') == 'completed']
-    tournament_data = get_tournaments(); tournament = tournament_data[0] if tournament_data else {}
+    data = load_page_data(teams=lambda: get_federations(LIVE_FEDERATIONS, view="card"), matches=lambda: get_matches(LIVE_MATCHES, view="row"), tournaments=get_tournaments)
+    teams = data['teams']; matches = data['matches']; completed_matches = [m for m in matches if m.get('status') == 'completed']
+    tournament = data['tournaments'][0] if data['tournaments'] else {}
     
     col1, col2, col3, col4 = st.columns(4)
     with col1: st.metric("Total Teams", len(teams))
@@ -372,16 +427,17 @@ def show_tournament_bracket():
     db = get_database(); show_enhanced_tournament_bracket(db) if db is not None else st.error("❌ Database unavailable")
 
 def show_enhanced_tournament_bracket(db):
-    matches = get_matches(); tournament_data = get_tournaments(); tournament = tournament_data[0] if tournament_data else {}
+    matches = get_matches(LIVE_MATCHES, view="row"); tournament_data = get_tournaments(); tournament = tournament_data[0] if tournament_data else {}
     col1, col2, col3 = st.columns(3)
     with col1: st.metric("Tournament Stage", tournament.get('current_stage', 'Not Started').replace('_', ' ').title())
     with col2: st.metric("Matches Completed", f"{len([m for m in matches if m.get('status') == 'completed'])}/{len(matches)}")
     with col3: st.metric("Status", "🏃‍♂️ LIVE" if tournament.get('status') == 'active' else "⏳ READY")
     
     st.markdown("---")
+    show_title_odds(db)
     if not matches:
         st.info("🎯 Tournament not started. Admin can start when 8 teams are registered.")
-        teams = get_federations()
+        teams = get_federations(LIVE_FEDERATIONS, view="card")
         if len(teams) >= 8:
             st.subheader("🎊 Ready to Start! Here's how the bracket would look:")
             random.shuffle(teams); col1, col2, col3 = st.columns([1, 1, 1])
@@ -460,6 +516,24 @@ def show_enhanced_tournament_bracket(db):
                 # CHANGED: Final score now in blue color for better visibility
                 st.markdown(f"""<div style="background: linear-gradient(135deg, #FFD700 0%, #FFEC8B 100%); padding: 2rem; border-radius: 15px; text-align: center; border: 3px solid #1E3C72; margin-top: 1rem;"><h2 style="color: #1E3C72; margin: 0;">🏆 TOURNAMENT CHAMPION 🏆</h2><h1 style="color: #1E3C72; margin: 1rem 0; font-size: 2.5em;">{winner_flag} {winner}</h1><p style="color: #1E3C72; margin: 0; font-size: 1.1em;">African Nations League 2025 Winner</p><div style="margin-top: 1rem; padding: 1rem; background: rgba(255,255,255,0.5); border-radius: 10px;"><strong style="color: #1E3C72; font-size: 1.2em;">Final Score: {team_a_name} {final_match['scoreA']} - {final_match['scoreB']} {team_b_name}</strong></div></div>""", unsafe_allow_html=True)
             else: display_enhanced_match_card(final_match, "FINAL", "CHAMPION")
+@st.cache_data(show_spinner=False, max_entries=16)
+def get_title_odds(state, n_sims=100_000):
+    # Keyed on the bracket state, so odds are only recomputed after a result changes.
+    # A drawn bracket is solved exactly; before the draw we fall back to Monte Carlo.
+    return exact_forecast(state) or forecast_tournament(state, n_sims)
+
+def show_title_odds(db):
+    # Built from the cached collections, so a rerun costs no extra round trips
+    try: state = build_bracket_state(get_federations(LIVE_FEDERATIONS, view="card"), get_matches(LIVE_MATCHES, view="row"))
+    except Exception as e: st.warning(f"Title odds unavailable: {str(e)}"); return
+    forecast = get_title_odds(state) if state else None
+    if not forecast: return
+    with st.expander("📈 Live Title Odds", expanded=False):
+        rows = [{"Team": f"{COUNTRY_FLAGS.get(r['country'], '🏴')} {r['country']}", "Semi-Final": f"{r['semifinal']:.1%}", "Final": f"{r['final']:.1%}", "Champion": f"{r['champion']:.1%}"} for r in forecast['teams']]
+        st.table(rows)
+        if forecast.get('method') == 'exact': st.caption("Exact probabilities for the remaining bracket")
+        else: st.caption(f"Based on {forecast['simulations']:,} simulations of the remaining bracket")
+
 def display_enhanced_match_card(match, match_label, next_round):
     # Handle NULL/None team names by providing defaults
     team_a_name = match.get('teamA_name') or "TBD"
@@ -481,13 +555,17 @@ def show_match_control():
     st.title("⚽ Match Control Center"); db = get_database()
     if db is None: st.error("Database unavailable"); return
     
+    engine_keys = list(ENGINE_MODES)
+    current_engine = st.session_state.get('engine_mode', 'classic')
+    st.session_state.engine_mode = st.selectbox("Simulation engine (Quick Simulate / Auto Simulate All; Minute-by-minute also drives live commentary)", engine_keys, format_func=ENGINE_MODES.get, index=engine_keys.index(current_engine) if current_engine in engine_keys else 0)
+    
     st.subheader("🎯 Tournament Management")
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("🚀 Start Tournament", use_container_width=True): initialize_tournament(db); st.rerun()
     with col2:
         if st.button("🔄 Reset Tournament", use_container_width=True):
-            try: db.matches.delete_many({}); db.tournaments.delete_many({}); st.success("Tournament reset!"); st.rerun()
+            try: db.matches.delete_many(LIVE_MATCHES); db.tournaments.delete_many({}); rebuild_stats(db); invalidate_collections("matches", "tournaments", "federations", "players"); st.success("Tournament reset!"); st.rerun()
             except Exception as e: st.error(f"Reset failed: {str(e)}")
     with col3:
         if st.button("⚡ Auto Simulate All", use_container_width=True): simulate_all_matches(db); st.rerun()
@@ -509,101 +587,113 @@ def play_match_with_commentary(match):
     try:
         db = get_database()
         if db is None: st.error("Database unavailable"); return
-        score_a, score_b, goal_scorers, commentary = simulate_match_realistic(db, match["_id"], match['teamA_name'], match['teamB_name'])
-        st.success(f"**Final: {match['teamA_name']} {score_a}-{score_b} {match['teamB_name']}**")
+        seed = match_seed(match); engine = 'minute' if st.session_state.get('engine_mode') == 'minute' else 'realistic'
+        if engine == 'minute':
+            # Minute-by-minute engine: rating-driven goal chances, match events and AI commentary
+            ratings = get_team_ratings(db, [match['teamA_name'], match['teamB_name']]); squads = get_squad_indexes(db, [match['teamA_name'], match['teamB_name']])
+            events = iter_match_with_commentary(match['teamA_name'], match['teamB_name'], ratings.get(match['teamA_name'], 75), ratings.get(match['teamB_name'], 75), seeded_rng(seed), squads)
+        else: events = iter_match_realistic(db, match['teamA_name'], match['teamB_name'], seeded_rng(seed))
+        # Events are rendered as the generator produces them; only the goal list is kept
+        score_box = st.empty(); score_a, score_b = 0, 0; goal_scorers = []
         with st.expander("📝 Match Commentary", expanded=True):
-            for comment in commentary: st.success(f"🎯 {comment}") if "GOAL!" in comment else st.info(f"↪️ {comment}") if "Assist" in comment else st.write(f"• {comment}")
+            live_feed = st.empty()
+            with live_feed.container():
+                for event in events:
+                    score_a, score_b = event['scoreA'], event['scoreB']
+                    if event.get('goal'): goal_scorers.append(event['goal'])
+                    score_box.info(f"**LIVE: {match['teamA_name']} {score_a}-{score_b} {match['teamB_name']}**")
+                    st.success(f"🎯 {event['text']}") if event['kind'] == 'goal' else st.info(f"↪️ {event['text']}") if event['kind'] == 'assist' else st.write(f"• {event['text']}")
+        score_box.success(f"**Final: {match['teamA_name']} {score_a}-{score_b} {match['teamB_name']}**")
         if goal_scorers:
             st.subheader("🥅 Goal Scorers")
             for goal in sorted(goal_scorers, key=lambda x: x['minute']):
                 flag = COUNTRY_FLAGS.get(goal['team'], "🏴"); assist_info = goal.get('assist', 'Unassisted')
                 st.write(f"**{goal['minute']}'** - {flag} **{goal['player']}** *({assist_info})*") if "Assist:" in assist_info else st.write(f"**{goal['minute']}'** - {flag} **{goal['player']}** (Solo goal)")
-        db.matches.update_one({"_id": match["_id"]}, {"$set": {"status": "completed", "scoreA": score_a, "scoreB": score_b, "goal_scorers": goal_scorers, "method": "commentary"}})
+        result = {"status": "completed", "scoreA": score_a, "scoreB": score_b, "goal_scorers": goal_scorers, "method": "commentary", "engine": engine, "seed": seed}
+        db.matches.update_one({"_id": match["_id"]}, {"$set": result}); invalidate_collections("matches")
+        record_match_stats(db, [match["_id"]]); queue_result_emails(db, [dict(match, **result)])
         advance_tournament(db, match); st.rerun()
     except Exception as e: st.error(f"Match simulation error: {str(e)}"); simulate_match_quick(match)
 
-def simulate_match_realistic(db, match_id, team_a_name, team_b_name):
-    # Get actual players from players collection
-    players_a = list(db.players.find({"country": team_a_name}))
-    players_b = list(db.players.find({"country": team_b_name}))
-    
-    score_a = random.randint(0, 3); score_b = random.randint(0, 3)
-    commentary = []; goal_scorers = []
-    commentary.append(f"Match between {team_a_name} and {team_b_name} begins!")
-    
-    def get_goal_event(players, team_name, minute):
-        if players:
-            field_players = [p for p in players if p.get('naturalPosition') != 'GK']
-            if field_players:
-                scorer = random.choice(field_players)
-                has_assist = random.random() < 0.7
-                if has_assist:
-                    possible_assisters = [p for p in field_players if p.get('name') != scorer.get('name')]
-                    if possible_assisters: assister = random.choice(possible_assisters); assist_text = f"Assist: {assister.get('name')}"
-                    else: assist_text = "Solo goal"
-                else: assist_text = "Solo goal"
-                return {"player": scorer.get('name'), "minute": minute, "team": team_name, "assist": assist_text}
-        return {"player": f"Player {random.randint(1, 23)}", "minute": minute, "team": team_name, "assist": "Unassisted"}
-    
-    for i in range(score_a):
-        minute = random.randint(1, 90); goal = get_goal_event(players_a, team_a_name, minute); goal_scorers.append(goal)
-        commentary.append(f"{minute}' - GOAL! {goal['player']} scores for {team_a_name}!")
-        if "Assist:" in goal['assist']: commentary.append(f"    Great work by {goal['assist'].replace('Assist: ', '')} to set up the goal!")
-    
-    for i in range(score_b):
-        minute = random.randint(1, 90); goal = get_goal_event(players_b, team_b_name, minute); goal_scorers.append(goal)
-        commentary.append(f"{minute}' - GOAL! {goal['player']} scores for {team_b_name}!")
-        if "Assist:" in goal['assist']: commentary.append(f"    Beautiful assist from {goal['assist'].replace('Assist: ', '')}!")
-    
-    commentary.append("What an exciting match!" if score_a + score_b > 0 else "A defensive battle ends goalless.")
-    commentary.append("Full time!")
+def iter_match_realistic(db, team_a_name, team_b_name, rng=None):
+    # Yields {'kind', 'minute', 'text', 'scoreA', 'scoreB'[, 'goal']} in match order
+    rng = rng or random
+    # Cached per-team squad indexes: no player queries after the first match of a team
+    squads = get_squad_indexes(db, [team_a_name, team_b_name]); squad_a, squad_b = squads[team_a_name], squads[team_b_name]
+    
+    score_a = rng.randint(0, 3); score_b = rng.randint(0, 3)
+    # Draw each goal's minute and then its scorer, team A's goals first, so a stored seed replays the same goals; only the telling is in minute order
+    goals = []
+    for side, count, squad, team_name in ((0, score_a, squad_a, team_a_name), (1, score_b, squad_b, team_b_name)):
+        for i in range(count):
+            minute = rng.randint(1, 90); goals.append((minute, side, squad.goal_event(team_name, minute, rng, 0.7)))
+    yield {"kind": "kickoff", "minute": 0, "text": f"Match between {team_a_name} and {team_b_name} begins!", "scoreA": 0, "scoreB": 0}
+    
+    live = [0, 0]
+    for minute, side, goal in sorted(goals, key=lambda g: (g[0], g[1])):
+        team_name = team_b_name if side else team_a_name; live[side] += 1
+        yield {"kind": "goal", "minute": minute, "text": f"{minute}' - GOAL! {goal['player']} scores for {team_name}!", "goal": goal, "scoreA": live[0], "scoreB": live[1]}
+        if "Assist:" in goal['assist']:
+            assister = goal['assist'].replace('Assist: ', '')
+            text = f"    Beautiful assist from {assister}!" if side else f"    Great work by {assister} to set up the goal!"
+            yield {"kind": "assist", "minute": minute, "text": text, "scoreA": live[0], "scoreB": live[1]}
+    
+    yield {"kind": "info", "minute": 90, "text": "What an exciting match!" if score_a + score_b > 0 else "A defensive battle ends goalless.", "scoreA": score_a, "scoreB": score_b}
+    yield {"kind": "info", "minute": 90, "text": "Full time!", "scoreA": score_a, "scoreB": score_b}
+
+def simulate_match_realistic(db, match_id, team_a_name, team_b_name, rng=None):
+    score_a, score_b = 0, 0; commentary = []; goal_scorers = []
+    for event in iter_match_realistic(db, team_a_name, team_b_name, rng):
+        score_a, score_b = event['scoreA'], event['scoreB']; commentary.append(event['text'])
+        if event.get('goal'): goal_scorers.append(event['goal'])
     return score_a, score_b, goal_scorers, commentary
 
-def simulate_match_quick(match):
+def simulate_match_quick(match, engine=None):
     db = get_database()
     if db is None: st.error("Database unavailable"); return
-    score_a = random.randint(0, 3); score_b = random.randint(0, 3)
-    
-    # Get actual players from players collection
-    players_a = list(db.players.find({"country": match['teamA_name']}))
-    players_b = list(db.players.find({"country": match['teamB_name']}))
-    
-    goal_scorers = []
-    def create_quick_goal(players, team_name, minute):
-        if players:
-            field_players = [p for p in players if p.get('naturalPosition') != 'GK']
-            if field_players:
-                scorer = random.choice(field_players)
-                has_assist = random.random() < 0.6
-                if has_assist:
-                    possible_assisters = [p for p in field_players if p.get('name') != scorer.get('name')]
-                    if possible_assisters: assister = random.choice(possible_assisters); assist_text = f"Assist: {assister.get('name')}"
-                    else: assist_text = "Solo goal"
-                else: assist_text = "Solo goal"
-                return {"player": scorer.get('name'), "minute": minute, "team": team_name, "assist": assist_text}
-        return {"player": f"Player {random.randint(1, 23)}", "minute": minute, "team": team_name, "assist": "Unassisted"}
-    
-    for i in range(score_a): goal_scorers.append(create_quick_goal(players_a, match['teamA_name'], random.randint(1, 90)))
-    for i in range(score_b): goal_scorers.append(create_quick_goal(players_b, match['teamB_name'], random.randint(1, 90)))
+    engine = engine or st.session_state.get('engine_mode', 'classic')
+    seed = match_seed(match); rng = seeded_rng(seed)
+    ratings = get_team_ratings(db, [match['teamA_name'], match['teamB_name']]) if engine != 'classic' else {}
+    minutes_a, minutes_b = simulate_goal_minutes(engine, ratings.get(match['teamA_name'], 75), ratings.get(match['teamB_name'], 75), rng)
+    score_a = len(minutes_a); score_b = len(minutes_b)
+    
+    squads = get_squad_indexes(db, [match['teamA_name'], match['teamB_name']]); squad_a, squad_b = squads[match['teamA_name']], squads[match['teamB_name']]
+    goal_scorers = [squad_a.goal_event(match['teamA_name'], minute, rng, 0.6) for minute in minutes_a]
+    goal_scorers += [squad_b.goal_event(match['teamB_name'], minute, rng, 0.6) for minute in minutes_b]
     goal_scorers.sort(key=lambda x: x['minute'])
     
     try:
-        db.matches.update_one({"_id": match["_id"]}, {"$set": {"status": "completed", "scoreA": score_a, "scoreB": score_b, "goal_scorers": goal_scorers, "method": "simulated"}})
+        result = {"status": "completed", "scoreA": score_a, "scoreB": score_b, "goal_scorers": goal_scorers, "method": "simulated", "engine": engine, "seed": seed}
+        db.matches.update_one({"_id": match["_id"]}, {"$set": result}); invalidate_collections("matches")
+        record_match_stats(db, [match["_id"]]); queue_result_emails(db, [dict(match, **result)])
         advance_tournament(db, match); st.success(f"Match simulated: {match['teamA_name']} {score_a}-{score_b} {match['teamB_name']}"); st.rerun()
     except Exception as e: st.error(f"Simulation failed: {str(e)}")
 
 def initialize_tournament(db):
     try:
-        teams = list(db.federations.find({}).limit(8))
+        teams = list(db.federations.find(LIVE_FEDERATIONS).limit(8))
         if len(teams) < 8: st.error(f"Need 8 teams. Currently: {len(teams)}"); return
-        random.shuffle(teams); db.matches.delete_many({})
+        # One tournament seed drives the draw and every match stream derived from it
+        tournament_seed = new_seed()
+        seeded_rng(derive_seed(tournament_seed, "draw")).shuffle(teams); db.matches.delete_many(LIVE_MATCHES); rebuild_stats(db)
         for i in range(0, 8, 2):
-            match_data = {"teamA_name": teams[i]["country"], "teamB_name": teams[i+1]["country"], "stage": "quarterfinal", "status": "scheduled", "scoreA": 0, "scoreB": 0, "created_at": datetime.now()}
+            match_data = {"teamA_name": teams[i]["country"], "teamB_name": teams[i+1]["country"], "stage": "quarterfinal", "status": "scheduled", "scoreA": 0, "scoreB": 0, "seed": derive_seed(tournament_seed, "quarterfinal", i // 2), "created_at": datetime.now()}
             db.matches.insert_one(match_data)
-        db.tournaments.update_one({}, {"$set": {"status": "active", "current_stage": "quarterfinal"}}, upsert=True)
+        db.tournaments.update_one({}, {"$set": {"status": "active", "current_stage": "quarterfinal", "seed": tournament_seed}}, upsert=True)
+        invalidate_collections("matches", "tournaments", "federations", "players")
         st.success("🎊 Tournament started! Quarter-finals created.")
     except Exception as e: st.error(f"Tournament start failed: {str(e)}")
 
+def record_match_stats(db, match_ids=None):
+    # Folds newly completed matches into the materialized standings and player stats
+    try: apply_match_results(db, match_ids); invalidate_collections("federations", "players")
+    except Exception as e: st.warning(f"Stats update failed: {str(e)}")
+
+def queue_result_emails(db, completed):
+    # Queued in the outbox and sent by the background workers over one SMTP session
+    try: queue_match_notifications(db, completed)
+    except Exception as e: st.warning(f"Could not queue result emails: {str(e)}")
+
 def advance_tournament(db, completed_match):
     try:
         stage = completed_match.get('stage'); all_matches = list(db.matches.find({"stage": stage}))
@@ -612,29 +702,49 @@ def advance_tournament(db, completed_match):
             elif stage == "semifinal": create_final(db)
     except Exception as e: st.error(f"Tournament advancement failed: {str(e)}")
 
+def get_tournament_seed(db):
+    tournament = db.tournaments.find_one({}, {"seed": 1}) or {}
+    return tournament["seed"] if tournament.get("seed") is not None else new_seed()
+
 def create_semifinals(db):
     try:
         quarters = list(db.matches.find({"stage": "quarterfinal", "status": "completed"}))
         winners = [match['teamA_name'] if match['scoreA'] > match['scoreB'] else match['teamB_name'] for match in quarters]
+        tournament_seed = get_tournament_seed(db)
         for i in range(0, 4, 2):
-            match_data = {"teamA_name": winners[i], "teamB_name": winners[i+1], "stage": "semifinal", "status": "scheduled", "scoreA": 0, "scoreB": 0, "created_at": datetime.now()}
+            match_data = {"teamA_name": winners[i], "teamB_name": winners[i+1], "stage": "semifinal", "status": "scheduled", "scoreA": 0, "scoreB": 0, "seed": derive_seed(tournament_seed, "semifinal", i // 2), "created_at": datetime.now()}
             db.matches.insert_one(match_data)
-        db.tournaments.update_one({}, {"$set": {"current_stage": "semifinal"}}); st.success("Semi-finals created!")
+        db.tournaments.update_one({}, {"$set": {"current_stage": "semifinal"}}); invalidate_collections("matches", "tournaments"); st.success("Semi-finals created!")
     except Exception as e: st.error(f"Semi-final creation failed: {str(e)}")
 
 def create_final(db):
     try:
         semis = list(db.matches.find({"stage": "semifinal", "status": "completed"}))
         winners = [match['teamA_name'] if match['scoreA'] > match['scoreB'] else match['teamB_name'] for match in semis]
-        match_data = {"teamA_name": winners[0], "teamB_name": winners[1], "stage": "final", "status": "scheduled", "scoreA": 0, "scoreB": 0, "created_at": datetime.now()}
-        db.matches.insert_one(match_data); db.tournaments.update_one({}, {"$set": {"current_stage": "final"}}); st.success("Final match created!")
+        match_data = {"teamA_name": winners[0], "teamB_name": winners[1], "stage": "final", "status": "scheduled", "scoreA": 0, "scoreB": 0, "seed": derive_seed(get_tournament_seed(db), "final", 0), "created_at": datetime.now()}
+        db.matches.insert_one(match_data); db.tournaments.update_one({}, {"$set": {"current_stage": "final"}}); invalidate_collections("matches", "tournaments"); st.success("Final match created!")
     except Exception as e: st.error(f"Final creation failed: {str(e)}")
 
-def simulate_all_matches(db):
+def simulate_all_matches(db, engine=None):
+    # Plays the rest of the bracket in memory, then writes every result and new round in one bulk_write
     try:
-        scheduled = list(db.matches.find({"status": "scheduled"}))
-        for match in scheduled: simulate_match_quick(match)
-        st.success("All matches simulated!")
+        engine = engine or st.session_state.get('engine_mode', 'classic')
+        matches = list(db.matches.find(LIVE_MATCHES).sort("_id", 1))
+        if not any(m.get('status') == 'scheduled' for m in matches): st.info("No scheduled matches to simulate"); return
+        countries = list({m[side] for m in matches for side in ('teamA_name', 'teamB_name') if m.get(side)})
+        ratings = get_team_ratings(db, countries) if engine != 'classic' else {}
+        squads = get_squad_indexes(db, countries)
+        results, created, stage = play_remaining(matches, ratings, squads, engine, get_tournament_seed(db))
+        
+        now = datetime.now()
+        operations = [UpdateOne({"_id": matches[i]["_id"]}, {"$set": fields}) for i, fields in results.items()]
+        created = [dict(match, _id=ObjectId(), created_at=now) for match in created]  # ids up front so result emails can be deduplicated
+        operations += [InsertOne(match) for match in created]
+        if operations: db.matches.bulk_write(operations, ordered=True)
+        if stage: db.tournaments.update_one({}, {"$set": {"current_stage": stage}})
+        invalidate_collections("matches", "tournaments"); record_match_stats(db, [matches[i]["_id"] for i in results] + [m["_id"] for m in created])
+        queue_result_emails(db, [dict(matches[i], **fields) for i, fields in results.items()] + created)
+        st.success(f"All matches simulated! ({len(results) + len(created)} matches)")
     except Exception as e: st.error(f"Simulation failed: {str(e)}")
 
 def show_my_team():
@@ -648,10 +758,11 @@ def show_my_team():
         col1, col2, col3 = st.columns(3)
         with col1: st.metric("Manager", user_team.get('manager', 'Unknown'))
         with col2: st.metric("Team Rating", user_team.get('rating', 75))
-        with col3: st.metric("Squad Size", f"{len(user_team.get('players', []))}/23")
+        squad = load_squad(db, user_team['country'])
+        with col3: st.metric("Squad Size", f"{len(squad)}/23")
         st.subheader("Team Squad")
         for pos in ["GK", "DF", "MD", "AT"]:
-            players = [p for p in user_team.get('players', []) if p['naturalPosition'] == pos]
+            players = [p for p in squad if p['naturalPosition'] == pos]
             if players:
                 with st.expander(f"{pos} - {len(players)} players"):
                     for player in players: st.write(f"**{player['name']}** - Rating: {player['ratings'][player['naturalPosition']]}{' ⭐' if player.get('isCaptain') else ''}")
@@ -668,8 +779,13 @@ def show_statistics_content(is_admin):
         return
     
     try:
+        data = load_page_data(
+            teams=lambda: get_federations(view="card", sort=[("rating", -1)]),
+            table=lambda: get_federations(view="standings", sort=[("points", -1), ("goalsFor", -1)]),
+            scorers=lambda: get_players({"goals": {"$gt": 0}}, view="leaderboard", sort=[("goals", -1), ("assists", -1)], limit=10),
+            completed=lambda: cached_aggregate("matches", analytics.completed_count_pipeline()))
         st.subheader("🏆 Team Standings")
-        teams = list(db.federations.find({}).sort("rating", -1))
+        teams = data['teams']
         if teams:
             col1, col2 = st.columns([2, 1])
             with col1:
@@ -685,15 +801,29 @@ def show_statistics_content(is_admin):
                         st.metric(f"{['🥇', '🥈', '🥉'][i]} {team['country']}", f"Rating: {team.get('rating', 75)}")
         else:
             st.info("No teams registered yet")
-        
+
+        st.subheader("📋 League Table")
+        table = data['table']
+        if any(t.get('wins', 0) + t.get('draws', 0) + t.get('losses', 0) for t in table):
+            st.dataframe([{"Team": f"{COUNTRY_FLAGS.get(t['country'], '🏴')} {t['country']}", "W": t.get('wins', 0), "D": t.get('draws', 0), "L": t.get('losses', 0), "GF": t.get('goalsFor', 0), "GA": t.get('goalsAgainst', 0), "GD": t.get('goalsFor', 0) - t.get('goalsAgainst', 0), "Pts": t.get('points', 0)} for t in table], hide_index=True, use_container_width=True)
+        else:
+            st.info("No results recorded yet")
+
+        st.subheader("⚽ Top Scorers")
+        scorers = data['scorers']
+        if scorers:
+            for i, player in enumerate(scorers):
+                st.write(f"{i+1}. {COUNTRY_FLAGS.get(player.get('country'), '🏴')} **{player['name']}** ({player.get('country')}) - {player.get('goals', 0)} goals, {player.get('assists', 0)} assists")
+        else:
+            st.info("No goals scored yet")
+
         st.subheader("📅 Match History")
-        # Get matches here - this was missing!
-        matches = list(db.matches.find({}))
-        
-        if matches:
-            completed_matches = [m for m in matches if m.get('status') == 'completed']
+        pages, total = analytics.page_count(data['completed'])
+        if total:
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) - 1 if pages > 1 else 0
+            completed_matches = cached_aggregate("matches", analytics.match_history_pipeline(page))
             if completed_matches:
-                for match in reversed(completed_matches[-10:]):
+                for match in completed_matches:
                     flag_a = COUNTRY_FLAGS.get(match.get('teamA_name', 'Team A'), "🏴")
                     flag_b = COUNTRY_FLAGS.get(match.get('teamB_name', 'Team B'), "🏴")
                     with st.expander(f"{flag_a} {match['teamA_name']} {match['scoreA']}-{match['scoreB']} {match['teamB_name']} {flag_b} - {match.get('stage', 'Unknown').title()}", expanded=False):
@@ -717,25 +847,66 @@ def show_statistics_content(is_admin):
                                 st.write(f"• {goal['minute']}' - {flag} **{goal['player']}** ({goal['team']}) - {assist_info}")
                         else:
                             st.info("No goal details available")
-            else:
-                st.info("No completed matches yet")
         else:
-            st.info("No matches played yet")
-            
+            st.info("No completed matches yet")
+
+        if is_admin:
+            st.subheader("📈 Tournament Analytics")
+            reports = load_page_data(
+                scorers=lambda: cached_aggregate("matches", analytics.top_scorers_pipeline()),
+                assisters=lambda: cached_aggregate("matches", analytics.top_assisters_pipeline()),
+                stages=lambda: cached_aggregate("matches", analytics.goals_per_stage_pipeline()),
+                records=lambda: cached_aggregate("matches", analytics.team_records_pipeline()))
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**Top Scorers (match history)**")
+                for row in analytics.scorer_rows(reports['scorers']):
+                    st.write(f"{COUNTRY_FLAGS.get(row['team'], '🏴')} **{row['player']}** ({row['team']}) - {row['goals']}")
+                st.write("**Goals per Stage**")
+                for row in reports['stages']:
+                    st.write(f"{str(row['_id']).title()}: {row['goals']} goals in {row['matches']} matches ({row['goals'] / row['matches']:.1f} per match)")
+            with col2:
+                st.write("**Top Assisters**")
+                for row in analytics.assister_rows(reports['assisters']):
+                    st.write(f"{COUNTRY_FLAGS.get(row['team'], '🏴')} **{row['player']}** ({row['team']}) - {row['assists']}")
+            records = reports['records']
+            if records:
+                st.write("**Team Records**")
+                st.dataframe([{"Team": r['_id'], "P": r['played'], "W": r['wins'], "D": r['draws'], "L": r['losses'], "GF": r['goalsFor'], "GA": r['goalsAgainst']} for r in records], hide_index=True, use_container_width=True)
+            show_admission_stats()
+
     except Exception as e:
         st.error(f"Error loading statistics: {str(e)}")
 
+def show_admission_stats():
+    admission = get_admission_control()
+    if admission is None: return
+    stats = admission.stats()
+    st.write("**Login & Registration Guard**")
+    col1, col2 = st.columns(2)
+    with col1: st.metric("Attempts in flight", f"{stats['in_flight']}/{stats['max_concurrent']}")
+    with col2: st.metric("Tracked keys", stats['tracked_keys'])
+    st.dataframe([{"Action": action.title(), "Admitted": c['admitted'], "Rate limited": c['rate_limited'], "Busy": c['busy']} for action, c in stats['actions'].items()], hide_index=True, use_container_width=True)
+
 # Database helper functions
-def get_federations(query={}, **kwargs):
-    try: db = get_database(); return list(db.federations.find(query, **kwargs)) if db is not None else []
+def get_federations(query={}, view=None, **kwargs):
+    try: return cached_find("federations", query, view=view, **kwargs)
     except Exception: return []
 
-def get_matches(query={}):
-    try: db = get_database(); return list(db.matches.find(query)) if db is not None else []
+def get_matches(query={}, view=None):
+    try: return cached_find("matches", query, view=view)
     except Exception: return []
 
+def get_players(query={}, view=None, **kwargs):
+    try: return cached_find("players", query, view=view, **kwargs)
+    except Exception: return []
+
+def get_team_ratings(db, countries):
+    try: return {f['country']: f.get('rating', 75) for f in db.federations.find({"country": {"$in": countries}}, {"country": 1, "rating": 1})}
+    except Exception: return {}
+
 def get_tournaments():
-    try: db = get_database(); return list(db.tournaments.find({})) if db is not None else []
+    try: return cached_find("tournaments")
     except Exception: return []
 
 if __name__ == "__main__":
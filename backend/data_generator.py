@@ -0,0 +1,197 @@
+"""Synthetic data at production-like volumes, for load testing pages and queries.
+
+Federations, their 23-player squads and a completed match history are drawn
+with numpy in chunks and streamed into MongoDB with unordered insert_many
+batches. Every document carries synthetic: True so a run can be removed again,
+and matches are filed under their own stages ("synthetic quarterfinal", ...)
+so the live bracket, which reads only the real stage names, never sees them:
+
+    python -m backend.data_generator --federations 5000 --matches 200000 --seed 7
+    python -m backend.data_generator --purge
+
+Squads follow create_player (3 GK, 8 DF, 8 MD, 4 AT; 65-90 in the natural
+position, 10-45 elsewhere) and scores come from the app's match engine.
+Match results are left for backend.stats_projector to fold in.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from bson import ObjectId
+from frontend.utils.match_engine import sample_scores_batch, MATCH_MINUTES
+from frontend.utils.forecaster import STAGES
+
+POSITIONS = ["GK", "DF", "MD", "AT"]
+SQUAD_POSITIONS = np.array([0] * 3 + [1] * 8 + [2] * 8 + [3] * 4)
+SQUAD_SIZE = len(SQUAD_POSITIONS)
+OUTFIELD = np.flatnonzero(SQUAD_POSITIONS != 0)
+FIRST_NAMES = ["John", "David", "Mohamed", "Ahmed", "Kofi", "Kwame", "Ibrahim", "Samuel", "Joseph", "Michael",
+               "Youssef", "Musa", "Said", "Tendai", "Blessing", "Prince", "Emmanuel", "Daniel", "Victor", "Adebayo"]
+LAST_NAMES = ["Diallo", "Traore", "Mensah", "Appiah", "Ouedraogo", "Ndiaye", "Kamara", "Sarr", "Keita", "Cisse",
+              "Camara", "Sow", "Diop", "Gueye", "Owusu", "Okafor", "Okoro", "Hussein", "Kamau", "Nkosi"]
+ASSIST_CHANCE = 0.6
+SYNTHETIC_STAGES = [f"synthetic {stage}" for stage in STAGES]
+DEFAULT_BATCH_SIZE = 5000
+
+class SyntheticLeague:
+    """Names, ratings and ids of every synthetic federation, kept as arrays for match generation"""
+
+    def __init__(self, n_federations, rng):
+        n_players = n_federations * SQUAD_SIZE
+        self.countries = [f"Synthetic {i:06d}" for i in range(n_federations)]
+        self.ids = [ObjectId() for _ in range(n_federations)]
+        self.player_ids = [ObjectId() for _ in range(n_players)]
+        self.first = rng.integers(0, len(FIRST_NAMES), n_players)
+        self.last = rng.integers(0, len(LAST_NAMES), n_players)
+        natural = rng.integers(65, 91, n_players)
+        self.ratings = rng.integers(10, 46, (n_players, len(POSITIONS)))
+        positions = np.tile(SQUAD_POSITIONS, n_federations)
+        self.ratings[np.arange(n_players), positions] = natural
+        # Team rating as register_federation computes it: mean natural rating
+        self.team_ratings = np.round(natural.reshape(n_federations, SQUAD_SIZE).mean(axis=1), 2)
+
+    def player_name(self, federation, slot):
+        i = federation * SQUAD_SIZE + slot
+        return f"{FIRST_NAMES[self.first[i]]} {LAST_NAMES[self.last[i]]}"
+
+def federation_documents(league, start, stop, registered_at):
+    for i in range(start, stop):
+        yield {
+            "_id": league.ids[i],
+            "country": league.countries[i],
+            "manager": f"Manager {i}",
+            "representative_name": f"Rep of {league.countries[i]}",
+            "representative_email": f"fed{i:06d}@synthetic.anleague.com",
+            "rating": float(league.team_ratings[i]),
+            "wins": 0, "draws": 0, "losses": 0, "goalsFor": 0, "goalsAgainst": 0, "points": 0,
+            "registered_at": registered_at,
+            "synthetic": True,
+        }
+
+def player_documents(league, start, stop, created_at):
+    for i in range(start, stop):
+        for slot in range(SQUAD_SIZE):
+            ratings = league.ratings[i * SQUAD_SIZE + slot]
+            yield {
+                "_id": league.player_ids[i * SQUAD_SIZE + slot],
+                "name": league.player_name(i, slot),
+                "country": league.countries[i],
+                "jerseyNumber": slot + 1,
+                "naturalPosition": POSITIONS[SQUAD_POSITIONS[slot]],
+                "ratings": {pos: int(ratings[p]) for p, pos in enumerate(POSITIONS)},
+                "federationId": league.ids[i],
+                "isCaptain": slot == 0,
+                "goals": 0, "assists": 0, "yellowCards": 0, "redCards": 0, "matchesPlayed": 0, "minutesPlayed": 0,
+                "createdAt": created_at,
+                "synthetic": True,
+            }
+
+def match_documents(league, n_matches, rng, now, days=365):
+    """n_matches completed fixtures between random pairs of federations"""
+    n_teams = len(league.countries)
+    team_a = rng.integers(0, n_teams, n_matches)
+    team_b = (team_a + rng.integers(1, n_teams, n_matches)) % n_teams
+    score_a, score_b = sample_scores_batch(league.team_ratings[team_a], league.team_ratings[team_b], rng)
+    stages = rng.integers(0, len(STAGES), n_matches)
+    ages = rng.integers(0, days * 86400, n_matches)
+
+    # Goal details for every goal of the chunk at once, then cut per match
+    totals = score_a + score_b
+    n_goals = int(totals.sum())
+    minutes = rng.integers(1, MATCH_MINUTES + 1, n_goals)
+    scorers = OUTFIELD[rng.integers(0, len(OUTFIELD), n_goals)]
+    assisters = OUTFIELD[rng.integers(0, len(OUTFIELD), n_goals)]
+    assisted = (rng.random(n_goals) < ASSIST_CHANCE) & (assisters != scorers)
+    offsets = np.concatenate(([0], np.cumsum(totals)))
+
+    for m in range(n_matches):
+        a, b = int(team_a[m]), int(team_b[m])
+        goals = []
+        for g in range(offsets[m], offsets[m + 1]):
+            team = a if g - offsets[m] < score_a[m] else b
+            goal = {"player": league.player_name(team, scorers[g]), "player_id": league.player_ids[team * SQUAD_SIZE + scorers[g]],
+                    "minute": int(minutes[g]), "team": league.countries[team], "assist": "Solo goal"}
+            if assisted[g]:
+                goal["assist"] = f"Assist: {league.player_name(team, assisters[g])}"
+                goal["assist_id"] = league.player_ids[team * SQUAD_SIZE + assisters[g]]
+            goals.append(goal)
+        goals.sort(key=lambda goal: goal["minute"])
+        yield {
+            "teamA_id": league.ids[a], "teamB_id": league.ids[b],
+            "teamA_name": league.countries[a], "teamB_name": league.countries[b],
+            "stage": SYNTHETIC_STAGES[stages[m]],
+            "status": "completed",
+            "scoreA": int(score_a[m]), "scoreB": int(score_b[m]),
+            "goal_scorers": goals,
+            "method": "synthetic",
+            "created_at": now - timedelta(seconds=int(ages[m])),
+            "synthetic": True,
+        }
+
+def insert_batches(collection, documents, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream documents into a collection with unordered insert_many batches"""
+    batch, inserted = [], 0
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+            batch = []
+    if batch:
+        inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+    return inserted
+
+def generate(db, n_federations, n_matches, seed=None, batch_size=DEFAULT_BATCH_SIZE, log=print):
+    """Write a synthetic league; returns {collection: documents inserted}"""
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    league = SyntheticLeague(n_federations, rng)
+    counts = {}
+
+    started = time.perf_counter()
+    counts["federations"] = insert_batches(db.federations, federation_documents(league, 0, n_federations, now), batch_size)
+    counts["players"] = insert_batches(db.players, player_documents(league, 0, n_federations, now), batch_size)
+    log(f"  ⚽ {counts['federations']} federations, {counts['players']} players in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    counts["matches"] = 0
+    for start in range(0, n_matches, batch_size):
+        chunk = min(batch_size, n_matches - start)
+        counts["matches"] += insert_batches(db.matches, match_documents(league, chunk, rng, now), batch_size)
+    log(f"  📅 {counts['matches']} matches in {time.perf_counter() - started:.1f}s")
+    return counts
+
+def purge(db):
+    """Delete every synthetic document; returns {collection: documents deleted}"""
+    return {name: db[name].delete_many({"synthetic": True}).deleted_count for name in ("matches", "players", "federations")}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load synthetic federations, players and matches into MongoDB")
+    parser.add_argument("--database", default=os.getenv("DATABASE_NAME", "AfricanLeague"))
+    parser.add_argument("--federations", type=int, default=1000)
+    parser.add_argument("--matches", type=int, default=50000)
+    parser.add_argument("--seed", type=int, help="random when omitted")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--purge", action="store_true", help="delete previously generated data instead")
+    args = parser.parse_args(argv)
+    if not args.purge and args.federations < 2:
+        parser.error("Need at least 2 federations")
+
+    from backend.storage import open_client
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client = open_client()
+    try:
+        db = client[args.database]
+        if args.purge:
+            print(f"🧹 Deleted {purge(db)}")
+        else:
+            print(f"🏭 Generating {args.federations} federations and {args.matches} matches...")
+            generate(db, args.federations, args.matches, args.seed, args.batch_size)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,14 @@
-import os
 import random
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+try:
+    from backend.index_manager import ensure_indexes
+    from backend.storage import open_client
+    from backend.passwords import PasswordHasher
+except ImportError:  # run as a script from inside backend/
+    from index_manager import ensure_indexes
+    from storage import open_client
+    from passwords import PasswordHasher
 
 load_dotenv()
 
@@ -18,7 +24,7 @@ def initialize_database():
     print("🚀 Initializing African Nations League Database...")
     
     # Connect to MongoDB
-    client = MongoClient(os.getenv('MONGODB_URI'))
+    client = open_client()
     db = client['AfricanLeague']
     
     # Clear existing data (optional - comment out if you want to keep data)
@@ -28,22 +34,23 @@ def initialize_database():
     
     # Create admin users
     print("👨‍💼 Creating admin users...")
+    hasher = PasswordHasher()
     db.users.insert_many([
         {
             "email": "admin@africanleague.com", 
-            "password": "admin123", 
+            "password": hasher.hash("admin123"), 
             "role": "admin", 
             "createdAt": datetime.utcnow()
         },
         {
             "email": "ammarcanani@gmail.com", 
-            "password": "admin123", 
+            "password": hasher.hash("admin123"), 
             "role": "admin", 
             "createdAt": datetime.utcnow()
         },
         {
             "email": "elsje.scott@uct.ac.za", 
-            "password": "admin123", 
+            "password": hasher.hash("admin123"), 
             "role": "admin", 
             "createdAt": datetime.utcnow()
         }
@@ -227,11 +234,8 @@ def initialize_database():
 
     # Create indexes for better performance
     print("📊 Creating database indexes...")
-    db.federations.create_index("country", unique=True)
-    db.players.create_index("federationId")
+    ensure_indexes(db)
     db.matches.create_index([("tournamentId", 1), ("round", 1)])
-    db.matches.create_index("status")
-    db.users.create_index("email", unique=True)
 
     # Verify data creation
     fed_count = db.federations.count_documents({})
@@ -283,7 +287,7 @@ def create_player(country, position, jersey_number, federation_id, is_captain=Fa
 
 def add_8th_team(country_name, manager_name, rep_name, rep_email):
     """Function to demonstrate adding the 8th team with actual manager name"""
-    client = MongoClient(os.getenv('MONGODB_URI'))
+    client = open_client()
     db = client['AfricanLeague']
     
     # Check if country already exists
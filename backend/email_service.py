@@ -1,97 +1,125 @@
 import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 import streamlit as st
+from backend.notification_worker import OutboxWorker, enqueue_messages, session_factory_from_config, digest_message
 
-def notify_federations_after_match(match_id):
+# Results for the same federation inside this window go out as one digest email
+DIGEST_WINDOW_SECONDS = 20
+
+def get_email_config():
+    """SMTP settings from secrets; real delivery stays off unless SEND_EMAILS is set"""
+    return {
+        "enabled": bool(st.secrets.get("SEND_EMAILS", False)) and bool(st.secrets.get("SENDER_EMAIL", "")),
+        "server": st.secrets.get("SMTP_SERVER", "smtp.gmail.com"),
+        "port": st.secrets.get("SMTP_PORT", 587),
+        "username": st.secrets.get("SENDER_EMAIL", ""),
+        "password": st.secrets.get("SENDER_PASSWORD", ""),
+        "starttls": st.secrets.get("SMTP_STARTTLS", True),
+        "digest_window": st.secrets.get("EMAIL_DIGEST_WINDOW_SECONDS", DIGEST_WINDOW_SECONDS),
+    }
+
+@st.cache_resource
+def get_notification_worker():
+    """The process-wide outbox worker pool, started on first use"""
+    from frontend.utils.database import get_health_monitor, database_of
+    # Resolved here on the script thread; the worker threads only ever touch the monitor itself
+    monitor = get_health_monitor()
+    return OutboxWorker(lambda: database_of(monitor), session_factory_from_config(get_email_config()), combine=digest_message).start()
+
+def match_result_body(match_details):
+    body = f"""
+        🏆 AFRICAN NATIONS LEAGUE - MATCH RESULT 🏆
+
+        Final Score: {match_details['teamA']} {match_details['scoreA']} - {match_details['scoreB']} {match_details['teamB']}
+
+        Match Type: {match_details.get('method', 'Simulated').title()}
+
+        Goal Scorers:
+        """
+
+    for goal in match_details.get('goal_scorers', []):
+        body += f"• {goal['player']} ({goal['minute']}') - {goal['team']}\n"
+
+    body += f"\n\nThank you for participating in the African Nations League!"
+    return body
+
+def match_result_messages(match, recipients):
+    """Outbox messages for a completed match, one per recipient address"""
+    match_details = {
+        'teamA': match['teamA_name'],
+        'teamB': match['teamB_name'],
+        'scoreA': match['scoreA'],
+        'scoreB': match['scoreB'],
+        'goal_scorers': match.get('goal_scorers', []),
+        'method': match.get('method', 'simulated')
+    }
+    subject = f"African Nations League - Match Result: {match_details['teamA']} vs {match_details['teamB']}"
+    body = match_result_body(match_details)
+    match_id = match.get('_id')
+    messages = []
+    for email in dict.fromkeys(recipients):
+        if email:
+            message = {"kind": "match_result", "ref": match_id, "to": email, "subject": subject, "body": body, "digest": "match_result"}
+            if match_id is not None:
+                message["dedupe_key"] = f"match_result:{match_id}:{email}"
+            messages.append(message)
+    return messages
+
+def queue_match_notifications(db, matches):
+    """Queue result emails for completed matches with one federation lookup and one insert.
+
+    Returns at once; the worker pool sends them after the digest window,
+    combining results for the same federation. A match already queued for a
+    recipient is skipped.
+    """
+    countries = {m[side] for m in matches for side in ('teamA_name', 'teamB_name') if m.get(side)}
+    emails = {f['country']: f.get('representative_email') for f in db.federations.find({"country": {"$in": list(countries)}}, {"country": 1, "representative_email": 1})}
+    messages = []
+    for match in matches:
+        messages += match_result_messages(match, [emails.get(match.get('teamA_name')), emails.get(match.get('teamB_name'))])
+    queued = enqueue_messages(db, messages, delay_seconds=float(get_email_config()["digest_window"]))
+    if queued:
+        get_notification_worker().notify()
+    return queued
+
+def notify_federations_after_match(match_id, match=None):
     """Notify both federations after a match is completed"""
     try:
         from frontend.utils.database import get_database
-        
+
         db = get_database()
-        if not db:
+        if db is None:
             print("📧 Email notification: Match completed (database not available)")
             return True
-        
-        match = db.matches.find_one({"_id": match_id})
+
+        match = match or db.matches.find_one({"_id": match_id})
         if not match:
             return False
-        
-        # Get federation emails
-        teamA = db.federations.find_one({"_id": match['teamA_id']})
-        teamB = db.federations.find_one({"_id": match['teamB_id']})
-        
-        if teamA and teamB:
-            match_details = {
-                'teamA': match['teamA_name'],
-                'teamB': match['teamB_name'],
-                'scoreA': match['scoreA'],
-                'scoreB': match['scoreB'],
-                'goal_scorers': match.get('goal_scorers', []),
-                'method': match.get('method', 'simulated')
-            }
-            
-            # Get email config from secrets
-            sender_email = st.secrets.get("SENDER_EMAIL", "")
-            sender_password = st.secrets.get("SENDER_PASSWORD", "")
-            smtp_server = st.secrets.get("SMTP_SERVER", "smtp.gmail.com")
-            smtp_port = st.secrets.get("SMTP_PORT", 587)
-            
-            if sender_email and sender_password:
-                # In production, this would send actual emails
-                print(f"📧 Email would be sent from: {sender_email}")
-                print(f"📧 To: {teamA['representative_email']} and {teamB['representative_email']}")
-                print(f"📧 Match: {match_details['teamA']} {match_details['scoreA']}-{match_details['scoreB']} {match_details['teamB']}")
-                
-                # Uncomment to send actual emails:
-                # send_actual_email(sender_email, sender_password, smtp_server, smtp_port, teamA['representative_email'], match_details)
-                # send_actual_email(sender_email, sender_password, smtp_server, smtp_port, teamB['representative_email'], match_details)
-            else:
-                print("📧 Email configuration not complete - printing to console instead")
-                print(f"Match result: {match_details['teamA']} {match_details['scoreA']}-{match_details['scoreB']} {match_details['teamB']}")
-            
-            return True
-        
-        return False
-        
+
+        return queue_match_notifications(db, [dict(match, _id=match_id)]) > 0
+
     except Exception as e:
         print(f"Email notification error: {str(e)}")
         return False
 
 def send_actual_email(sender_email, sender_password, smtp_server, smtp_port, recipient_email, match_details):
-    """Actually send an email (commented out for safety)"""
+    """Send one email over its own connection (the outbox worker reuses one session instead)"""
     try:
         # Create message
-        message = MimeMultipart()
+        message = MIMEMultipart()
         message['From'] = sender_email
         message['To'] = recipient_email
         message['Subject'] = f"African Nations League - Match Result: {match_details['teamA']} vs {match_details['teamB']}"
-        
-        # Create email body
-        body = f"""
-        🏆 AFRICAN NATIONS LEAGUE - MATCH RESULT 🏆
-        
-        Final Score: {match_details['teamA']} {match_details['scoreA']} - {match_details['scoreB']} {match_details['teamB']}
-        
-        Match Type: {match_details.get('method', 'Simulated').title()}
-        
-        Goal Scorers:
-        """
-        
-        for goal in match_details.get('goal_scorers', []):
-            body += f"• {goal['player']} ({goal['minute']}') - {goal['team']}\n"
-        
-        body += f"\n\nThank you for participating in the African Nations League!"
-        
-        message.attach(MimeText(body, 'plain'))
-        
+        message.attach(MIMEText(match_result_body(match_details), 'plain'))
+
         # Send email
         with smtplib.SMTP(smtp_server, smtp_port) as server:
             server.starttls()
             server.login(sender_email, sender_password)
             server.send_message(message)
-            
+
         print(f"✅ Email sent to: {recipient_email}")
-        
+
     except Exception as e:
         print(f"❌ Failed to send email to {recipient_email}: {str(e)}")
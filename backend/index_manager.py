@@ -0,0 +1,143 @@
+import os
+import sys
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+# Indexes for the queries the app actually runs (see QUERY_SHAPES)
+INDEX_SPECS = [
+    ("federations", [("country", ASCENDING)], {"unique": True}),
+    ("federations", [("representative_email", ASCENDING)], {}),
+    ("federations", [("rating", DESCENDING)], {}),
+    ("federations", [("points", DESCENDING), ("goalsFor", DESCENDING)], {}),
+    ("matches", [("stage", ASCENDING), ("status", ASCENDING)], {}),
+    ("matches", [("status", ASCENDING), ("_id", DESCENDING)], {}),
+    ("matches", [("stats_claim", ASCENDING)], {"sparse": True}),
+    ("players", [("country", ASCENDING), ("jerseyNumber", ASCENDING)], {}),
+    ("players", [("federationId", ASCENDING)], {}),
+    ("players", [("goals", DESCENDING)], {}),
+    ("players", [("country", ASCENDING), ("name", ASCENDING)], {}),
+    ("users", [("email", ASCENDING)], {"unique": True}),
+    ("outbox", [("status", ASCENDING), ("next_attempt_at", ASCENDING)], {}),
+    ("outbox", [("status", ASCENDING), ("lease_expires_at", ASCENDING)], {}),
+    ("outbox", [("to", ASCENDING), ("digest", ASCENDING), ("status", ASCENDING), ("next_attempt_at", ASCENDING)], {}),
+    ("outbox", [("dedupe_key", ASCENDING)], {"unique": True, "sparse": True}),
+    ("outbox", [("claim", ASCENDING)], {"sparse": True}),
+]
+
+# (description, collection, filter, sort) for every query shape in app.py and the utils.
+# Unfiltered reads of small collections are expected to scan and are marked as such.
+QUERY_SHAPES = [
+    ("register: country taken?", "federations", {"country": "Nigeria"}, None),
+    ("ratings / squads for a fixture", "federations", {"country": {"$in": ["Nigeria", "Egypt"]}}, None),
+    ("my team by representative", "federations", {"representative_email": "rep@example.com"}, None),
+    ("standings by rating", "federations", {}, [("rating", DESCENDING)]),
+    ("league table", "federations", {}, [("points", DESCENDING), ("goalsFor", DESCENDING)]),
+    ("advance: matches of a stage", "matches", {"stage": "quarterfinal"}, None),
+    ("semis/final: completed matches of a stage", "matches", {"stage": "quarterfinal", "status": "completed"}, None),
+    ("match control: scheduled matches", "matches", {"status": "scheduled"}, None),
+    ("analytics: match history page", "matches", {"status": "completed"}, [("_id", DESCENDING)]),
+    ("bracket state", "matches", {"stage": {"$in": ["quarterfinal", "semifinal", "final"]}}, [("_id", ASCENDING)]),
+    ("squad of a country", "players", {"country": "Nigeria"}, [("country", ASCENDING), ("jerseyNumber", ASCENDING)]),
+    ("squads of a fixture", "players", {"country": {"$in": ["Nigeria", "Egypt"]}}, [("country", ASCENDING), ("jerseyNumber", ASCENDING)]),
+    ("migration: embedded squads (full scan expected)", "federations", {"players.0": {"$exists": True}}, None),
+    ("stats: player by country and name", "players", {"country": "Nigeria", "name": "John Diallo"}, None),
+    ("top scorers", "players", {"goals": {"$gt": 0}}, [("goals", DESCENDING)]),
+    ("stats: pending results", "matches", {"status": "completed", "stats_applied": {"$ne": True}}, None),
+    ("stats: claimed batch", "matches", {"stats_claim": "token"}, None),
+    ("login / session revalidation", "users", {"email": "admin@africanleague.com"}, None),
+    ("outbox: due messages", "outbox", {"status": "pending", "next_attempt_at": {"$lte": datetime(2025, 1, 1)}}, [("next_attempt_at", ASCENDING)]),
+    ("outbox: expired leases", "outbox", {"status": "sending", "lease_expires_at": {"$lte": datetime(2025, 1, 1)}}, None),
+    ("outbox: rest of a digest group", "outbox", {"status": "pending", "to": "rep@example.com", "digest": "match_result", "next_attempt_at": {"$lte": datetime(2025, 1, 1)}}, None),
+    ("outbox: claimed batch", "outbox", {"claim": "token"}, [("created_at", ASCENDING)]),
+    ("all federations (full scan expected)", "federations", {}, None),
+    ("live federations (full scan expected)", "federations", {"synthetic": {"$ne": True}}, None),
+    ("live tournament matches", "matches", {"stage": {"$in": ["quarterfinal", "semifinal", "final"]}}, None),
+    ("tournament document (full scan expected)", "tournaments", {}, None),
+]
+
+def ensure_indexes(db, verbose=False):
+    """Create every index in INDEX_SPECS; safe to run on every startup.
+
+    create_index is a no-op when the index already exists. Conflicts (an
+    existing index with other options, or duplicates blocking a unique
+    index) are reported instead of raised. Returns the list of problems.
+    """
+    problems = []
+    for collection, keys, options in INDEX_SPECS:
+        try:
+            name = db[collection].create_index(keys, **options)
+            if verbose:
+                print(f"  ✅ {collection}.{name}")
+        except OperationFailure as e:
+            problems.append(f"{collection} {keys}: {e}")
+            if verbose:
+                print(f"  ⚠️ {collection} {keys}: {e}")
+    return problems
+
+def _plan_stages(plan):
+    """All stage names in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+def audit_queries(db):
+    """explain() every query shape and return [(description, collection, stages, is_collscan)]
+
+    Raises NotImplementedError on the memory engine, which scans every query
+    and has no query plans to audit.
+    """
+    report = []
+    for description, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = cursor.explain()
+        if explain.get("engine") == "memory":
+            raise NotImplementedError("The memory engine has no query planner; run the audit against MongoDB")
+        stages = list(_plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {})))
+        report.append((description, collection, stages, "COLLSCAN" in stages))
+    return report
+
+def main(argv=None):
+    from backend.storage import open_client
+    from dotenv import load_dotenv
+
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "ensure"
+    load_dotenv()
+    client = open_client()
+    db = client[os.getenv('DATABASE_NAME', 'AfricanLeague')]
+    try:
+        if command == "ensure":
+            print("📊 Ensuring indexes...")
+            problems = ensure_indexes(db, verbose=True)
+            return 1 if problems else 0
+        if command == "audit":
+            print("🔍 Query plan audit")
+            try:
+                report = audit_queries(db)
+            except NotImplementedError as e:
+                print(f"  ⚠️ {e}")
+                return 2
+            flagged = 0
+            for description, collection, stages, collscan in report:
+                expected = "full scan expected" in description
+                if collscan and not expected:
+                    flagged += 1
+                marker = "❌ COLLSCAN" if collscan and not expected else "✅"
+                print(f"  {marker} {collection}: {description} -> {' > '.join(stages)}")
+            print(f"\n{flagged} query shape(s) fall back to a collection scan")
+            return 1 if flagged else 0
+        print("Usage: python -m backend.index_manager [ensure|audit]")
+        return 2
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1002 @@
+"""In-process storage engine with the pymongo API subset this app uses.
+
+MemoryClient, MemoryDatabase and MemoryCollection stand in for MongoClient,
+Database and Collection. They support the same query, update, projection and
+aggregation semantics for the operators the app and its tools send, so the
+app, the CLIs and benchmarks run with no MongoDB at all. Select the engine
+with a memory:// URI (see backend.storage.open_client).
+
+Documents are deep-copied on the way in and out, as they would be on the
+wire. Unique indexes are enforced, and every indexed field also gets a hash
+lookup, so equality and $in filters on it skip the collection scan.
+"""
+import copy
+import re
+import threading
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+_MISSING = object()
+
+# ---------------------------------------------------------------- documents
+
+def _path_values(value, parts):
+    """Every value at a dotted path, descending into arrays as MongoDB does"""
+    if not parts:
+        return [value]
+    head, rest = parts[0], parts[1:]
+    if isinstance(value, dict):
+        return _path_values(value[head], rest) if head in value else []
+    if isinstance(value, list):
+        if head.isdigit():
+            index = int(head)
+            return _path_values(value[index], rest) if index < len(value) else []
+        found = []
+        for item in value:
+            if isinstance(item, (dict, list)):
+                found.extend(_path_values(item, parts))
+        return found
+    return []
+
+def get_path(document, path, default=None):
+    """First value at a dotted path (aggregation field-path semantics for scalars)"""
+    values = _path_values(document, path.split("."))
+    return values[0] if values else default
+
+def _set_path(document, path, value):
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        if isinstance(target, list):
+            target = target[int(part)]
+        else:
+            target = target.setdefault(part, {})
+    if isinstance(target, list):
+        target[int(parts[-1])] = value
+    else:
+        target[parts[-1]] = value
+
+def _unset_path(document, path):
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        target = target.get(part) if isinstance(target, dict) else None
+        if target is None:
+            return
+    if isinstance(target, dict):
+        target.pop(parts[-1], None)
+
+# ---------------------------------------------------------------- ordering
+
+_TYPE_ORDER = [(type(None), 0), (bool, 5), ((int, float), 1), (str, 2), (dict, 3), (list, 4), (ObjectId, 6), (datetime, 7)]
+
+def _type_rank(value):
+    for types, rank in _TYPE_ORDER:
+        if isinstance(value, types):
+            return rank
+    return 8
+
+def sort_key(value):
+    """A key that orders mixed BSON values the way MongoDB compares them"""
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, dict):
+        return (3, tuple((k, sort_key(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return (4, tuple(sort_key(v) for v in value))
+    return (_type_rank(value), value)
+
+def _comparable(a, b):
+    return a is not None and b is not None and _type_rank(a) == _type_rank(b)
+
+def sort_documents(documents, spec):
+    """Stable multi-key sort; spec is [(field, 1 | -1), ...]"""
+    documents = list(documents)
+    for field, direction in reversed(list(spec)):
+        documents.sort(key=lambda d: sort_key(get_path(d, field, _MISSING)), reverse=direction < 0)
+    return documents
+
+def _sort_spec(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(k, d) for k, d in key_or_list]
+
+# ---------------------------------------------------------------- queries
+
+def _equals(candidate, expected):
+    if isinstance(candidate, list) and not isinstance(expected, list):
+        return any(_equals(item, expected) for item in candidate)
+    return candidate == expected
+
+def _compare(op, candidate, expected):
+    if isinstance(candidate, list):
+        return any(_compare(op, item, expected) for item in candidate)
+    if not _comparable(candidate, expected):
+        return False
+    if op == "$gt":
+        return candidate > expected
+    if op == "$gte":
+        return candidate >= expected
+    if op == "$lt":
+        return candidate < expected
+    return candidate <= expected
+
+def _regex(pattern, options=""):
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = (re.IGNORECASE if "i" in options else 0) | (re.MULTILINE if "m" in options else 0)
+    return re.compile(pattern, flags)
+
+def _matches_condition(values, condition):
+    """values: everything at the path (empty when missing); condition: a value or an operator dict"""
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        options = condition.get("$options", "")
+        for op, expected in condition.items():
+            if op == "$options":
+                continue
+            if op == "$eq":
+                ok = any(_equals(v, expected) for v in values) or (expected is None and not values)
+            elif op == "$ne":
+                ok = not (any(_equals(v, expected) for v in values) or (expected is None and not values))
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                ok = any(_compare(op, v, expected) for v in values)
+            elif op == "$in":
+                ok = any(_equals(v, e) for v in values for e in expected) or (None in expected and not values)
+            elif op == "$nin":
+                ok = not (any(_equals(v, e) for v in values for e in expected) or (None in expected and not values))
+            elif op == "$exists":
+                ok = bool(values) == bool(expected)
+            elif op == "$regex":
+                pattern = _regex(expected, options)
+                ok = any(isinstance(v, str) and pattern.search(v) for v in _flatten(values))
+            elif op == "$not":
+                ok = not _matches_condition(values, expected)
+            elif op == "$size":
+                ok = any(isinstance(v, list) and len(v) == expected for v in values)
+            elif op == "$elemMatch":
+                ok = any(isinstance(v, list) and any(isinstance(i, dict) and matches(i, expected) for i in v) for v in values)
+            elif op == "$all":
+                ok = all(any(_equals(v, e) for v in values) for e in expected)
+            else:
+                raise OperationFailure(f"unknown operator: {op}")
+            if not ok:
+                return False
+        return True
+    if isinstance(condition, re.Pattern):
+        return any(isinstance(v, str) and condition.search(v) for v in _flatten(values))
+    if condition is None:
+        return not values or any(v is None for v in values)
+    return any(_equals(v, condition) for v in values)
+
+def _flatten(values):
+    for value in values:
+        if isinstance(value, list):
+            yield from value
+        else:
+            yield value
+
+def matches(document, query):
+    """True when a document satisfies a MongoDB filter"""
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(document, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, q) for q in condition):
+                return False
+        elif not _matches_condition(_path_values(document, key.split(".")), condition):
+            return False
+    return True
+
+# ---------------------------------------------------------------- updates
+
+def _is_operator_update(update):
+    return bool(update) and all(k.startswith("$") for k in update)
+
+def apply_update(document, update, inserting=False):
+    """Apply update operators to a document in place"""
+    if not _is_operator_update(update):
+        raise ValueError("update only works with $ operators")
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set":
+                _set_path(document, path, copy.deepcopy(value))
+            elif op == "$setOnInsert":
+                if inserting:
+                    _set_path(document, path, copy.deepcopy(value))
+            elif op == "$unset":
+                _unset_path(document, path)
+            elif op == "$inc":
+                _set_path(document, path, get_path(document, path, 0) + value)
+            elif op in ("$min", "$max"):
+                current = get_path(document, path, _MISSING)
+                if current is _MISSING or (value < current if op == "$min" else value > current):
+                    _set_path(document, path, value)
+            elif op in ("$push", "$addToSet"):
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                array = get_path(document, path, _MISSING)
+                if array is _MISSING:
+                    array = []
+                    _set_path(document, path, array)
+                for item in items:
+                    if op == "$push" or item not in array:
+                        array.append(copy.deepcopy(item))
+            elif op == "$pull":
+                array = get_path(document, path, [])
+                _set_path(document, path, [i for i in array if not (matches(i, value) if isinstance(value, dict) else i == value)])
+            else:
+                raise OperationFailure(f"unknown update operator: {op}")
+
+def _upsert_seed(query):
+    """The equality fields of a filter, as an upserted document starts from"""
+    seed = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            if "$eq" in condition:
+                _set_path(seed, key, copy.deepcopy(condition["$eq"]))
+            continue
+        _set_path(seed, key, copy.deepcopy(condition))
+    return seed
+
+# ---------------------------------------------------------------- projection
+
+def project(document, projection):
+    """find() projection: inclusion or exclusion of (dotted) fields, _id kept unless excluded"""
+    if not projection:
+        return copy.deepcopy(document)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = {k: v for k, v in projection.items() if k != "_id"}
+    if all(v in (0, False) for v in include.values()):
+        result = copy.deepcopy(document)
+        for field in include:
+            _unset_path(result, field)
+        if projection.get("_id", 1) in (0, False):
+            result.pop("_id", None)
+        return result
+    result = {}
+    if projection.get("_id", 1) not in (0, False) and "_id" in document:
+        result["_id"] = copy.deepcopy(document["_id"])
+    for field, flag in include.items():
+        if flag in (0, False):
+            continue
+        value = get_path(document, field, _MISSING)
+        if value is not _MISSING:
+            _set_path(result, field, copy.deepcopy(value))
+    return result
+
+# ---------------------------------------------------------------- aggregation
+
+def _truthy(value):
+    return value not in (None, False, 0) and value is not _MISSING
+
+def compile_expression(expression):
+    """Turn an aggregation expression into a function of the document, once per stage.
+
+    Supports field paths, literals, objects, arrays and common operators.
+    """
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _field_getter(expression[1:].split("."))
+    if isinstance(expression, list):
+        items = [compile_expression(e) for e in expression]
+        return lambda document: [item(document) for item in items]
+    if not isinstance(expression, dict):
+        return lambda document: expression
+    if len(expression) == 1:
+        op, args = next(iter(expression.items()))
+        if op.startswith("$"):
+            return _compile_operator(op, args)
+    fields = [(key, compile_expression(value)) for key, value in expression.items()]
+    return lambda document: {key: field(document) for key, field in fields}
+
+def _field_getter(parts):
+    def get(document):
+        value = document
+        for i, part in enumerate(parts):
+            if isinstance(value, dict):
+                value = value.get(part, _MISSING)
+                if value is _MISSING:
+                    return None
+            else:
+                # Arrays on the way take the general path
+                return next(iter(_path_values(value, parts[i:])), None)
+        return value
+    return get
+
+def evaluate(expression, document):
+    return compile_expression(expression)(document)
+
+def _compile_operator(op, args):
+    if op == "$literal":
+        return lambda document: args
+    if op == "$cond":
+        if isinstance(args, dict):
+            args = [args["if"], args["then"], args["else"]]
+        condition, then, otherwise = (compile_expression(a) for a in args)
+        return lambda document: then(document) if _truthy(condition(document)) else otherwise(document)
+    operands = [compile_expression(a) for a in (args if isinstance(args, list) else [args])]
+    if op not in _OPERATORS:
+        raise OperationFailure(f"unsupported expression operator: {op}")
+    return lambda document: _operator(op, [operand(document) for operand in operands])
+
+_OPERATORS = {"$add", "$subtract", "$multiply", "$divide", "$eq", "$ne", "$gt", "$gte", "$lt", "$lte",
+              "$and", "$or", "$not", "$ifNull", "$size", "$concat", "$toLower", "$toUpper", "$substrCP"}
+
+def _operator(op, values):
+    if op == "$add":
+        return sum(v or 0 for v in values)
+    if op == "$subtract":
+        return (values[0] or 0) - (values[1] or 0)
+    if op == "$multiply":
+        result = 1
+        for v in values:
+            result *= v or 0
+        return result
+    if op == "$divide":
+        return values[0] / values[1] if values[1] else None
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        a, b = (sort_key(values[0]), sort_key(values[1]))
+        return {"$eq": a == b, "$ne": a != b, "$gt": a > b, "$gte": a >= b, "$lt": a < b, "$lte": a <= b}[op]
+    if op == "$and":
+        return all(_truthy(v) for v in values)
+    if op == "$or":
+        return any(_truthy(v) for v in values)
+    if op == "$not":
+        return not _truthy(values[0])
+    if op == "$ifNull":
+        return next((v for v in values if v is not None), None)
+    if op == "$size":
+        return len(values[0] or [])
+    if op == "$concat":
+        return None if any(v is None for v in values) else "".join(values)
+    if op == "$toLower":
+        return (values[0] or "").lower()
+    if op == "$toUpper":
+        return (values[0] or "").upper()
+    if op == "$substrCP":
+        text, start, length = values
+        return (text or "")[start:start + length]
+    raise OperationFailure(f"unsupported expression operator: {op}")
+
+def _freeze(value):
+    if isinstance(value, (str, int, float, type(None))):
+        return value
+    if isinstance(value, dict):
+        return ("d", tuple((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return ("l", tuple(_freeze(v) for v in value))
+    return value
+
+def _lookup_keys(values):
+    """Hash keys a document is filed under for its values at one path (array elements included)"""
+    keys = set()
+    for value in values:
+        keys.add(_freeze(value))
+        if isinstance(value, list):
+            keys |= _lookup_keys(value)
+    return keys
+
+def _lookup_values(condition):
+    """The values an equality or $in condition can match, or None when a lookup cannot serve it"""
+    if isinstance(condition, dict):
+        if set(condition) == {"$eq"}:
+            values = [condition["$eq"]]
+        elif set(condition) == {"$in"} and isinstance(condition["$in"], (list, tuple)):
+            values = list(condition["$in"])
+        else:
+            return None
+    else:
+        values = [condition]
+    # null also matches missing fields, and documents, arrays and patterns compare by more than hash
+    if any(v is None or isinstance(v, (dict, list, re.Pattern)) for v in values):
+        return None
+    return values
+
+def _group(documents, spec):
+    groups = {}
+    accumulators = {k: v for k, v in spec.items() if k != "_id"}
+    group_key = compile_expression(spec["_id"])
+    compiled = [(field, op, compile_expression(expression)) for field, accumulator in accumulators.items() for op, expression in accumulator.items()]
+    for document in documents:
+        key = group_key(document)
+        frozen = _freeze(key)
+        state = groups.get(frozen)
+        if state is None:
+            state = groups[frozen] = {"_id": key, "_n": {}}
+        for field, op, expression in compiled:
+            value = expression(document)
+            if op == "$sum":
+                state[field] = state.get(field, 0) + (value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0)
+            elif op == "$avg":
+                if isinstance(value, (int, float)):
+                    state[field] = state.get(field, 0) + value
+                    state["_n"][field] = state["_n"].get(field, 0) + 1
+                else:
+                    state.setdefault(field, 0)
+            elif op == "$min":
+                if value is not None and (field not in state or sort_key(value) < sort_key(state[field])):
+                    state[field] = value
+            elif op == "$max":
+                if value is not None and (field not in state or sort_key(value) > sort_key(state[field])):
+                    state[field] = value
+            elif op == "$first":
+                state.setdefault(field, value)
+            elif op == "$last":
+                state[field] = value
+            elif op == "$push":
+                state.setdefault(field, []).append(value)
+            elif op == "$addToSet":
+                bucket = state.setdefault(field, [])
+                if value not in bucket:
+                    bucket.append(value)
+            else:
+                raise OperationFailure(f"unsupported accumulator: {op}")
+    results = []
+    for state in groups.values():
+        counts = state.pop("_n")
+        for field, n in counts.items():
+            state[field] = state[field] / n
+        for field, accumulator in accumulators.items():
+            if next(iter(accumulator)) == "$avg" and field not in counts:
+                state[field] = None
+            state.setdefault(field, None)
+        results.append(state)
+    return results
+
+def _project_stage(documents, spec):
+    if spec and all(v in (0, False) for k, v in spec.items()):
+        return [project(d, spec) for d in documents]
+    id_spec = spec.get("_id", 1)
+    id_expression = None if id_spec in (0, False, 1, True) else compile_expression(id_spec)
+    fields = [(field, None if value in (1, True) else compile_expression(value))
+              for field, value in spec.items() if field != "_id" and value not in (0, False)]
+    results = []
+    for document in documents:
+        result = {}
+        if id_spec not in (0, False) and "_id" in document:
+            result["_id"] = document["_id"] if id_expression is None else id_expression(document)
+        for field, expression in fields:
+            if expression is None:
+                found = get_path(document, field, _MISSING)
+                if found is not _MISSING:
+                    _set_path(result, field, found)
+            else:
+                _set_path(result, field, expression(document))
+        results.append(result)
+    return results
+
+def _unwind(documents, spec):
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    path = spec["path"][1:]
+    keep_empty = spec.get("preserveNullAndEmptyArrays", False)
+    for document in documents:
+        value = get_path(document, path, _MISSING)
+        if isinstance(value, list) and value:
+            for item in value:
+                unwound = copy.deepcopy(document) if "." in path else dict(document)
+                _set_path(unwound, path, item)
+                yield unwound
+        elif isinstance(value, list) or value is _MISSING or value is None:
+            if keep_empty:
+                yield document
+        else:
+            yield document
+
+def run_pipeline(documents, pipeline):
+    """Run aggregation stages over an iterable of documents"""
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            documents = [d for d in documents if matches(d, spec)]
+        elif name == "$sort":
+            documents = sort_documents(documents, _sort_spec(spec))
+        elif name == "$skip":
+            documents = list(documents)[spec:]
+        elif name == "$limit":
+            documents = list(documents)[:spec]
+        elif name == "$unwind":
+            documents = list(_unwind(documents, spec))
+        elif name == "$group":
+            documents = _group(documents, spec)
+        elif name == "$project":
+            documents = _project_stage(documents, spec)
+        elif name in ("$addFields", "$set"):
+            fields = [(k, compile_expression(v)) for k, v in spec.items()]
+            documents = [dict(d, **{k: f(d) for k, f in fields}) for d in documents]
+        elif name == "$count":
+            documents = [{spec: len(list(documents))}]
+        else:
+            raise OperationFailure(f"unsupported pipeline stage: {name}")
+    return list(documents)
+
+# ---------------------------------------------------------------- results
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+class UpdateResult:
+    def __init__(self, matched_count, modified_count, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+class DeleteResult:
+    def __init__(self, deleted_count):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+class BulkWriteResult:
+    def __init__(self):
+        self.inserted_count = self.matched_count = self.modified_count = self.deleted_count = self.upserted_count = 0
+        self.upserted_ids = {}
+        self.acknowledged = True
+
+class _BulkCollector:
+    """Receives pymongo write models through their _add_to_bulk hook"""
+
+    def __init__(self):
+        self.operations = []
+
+    def add_insert(self, document, *args, **kwargs):
+        self.operations.append(("insert", document))
+
+    def add_update(self, selector, update, multi=False, upsert=False, *args, **kwargs):
+        self.operations.append(("update", selector, update, multi, upsert))
+
+    def add_replace(self, selector, replacement, upsert=False, *args, **kwargs):
+        self.operations.append(("replace", selector, replacement, upsert))
+
+    def add_delete(self, selector, limit, *args, **kwargs):
+        self.operations.append(("delete", selector, limit))
+
+# ---------------------------------------------------------------- collections
+
+class MemoryCursor:
+    def __init__(self, collection, query, projection, sort=None, skip=0, limit=0):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = _sort_spec(sort) if sort else None
+        self._skip = skip
+        self._limit = limit
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def _documents(self):
+        documents = self._collection._select(self._query)
+        if self._sort:
+            documents = sort_documents(documents, self._sort)
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return [project(d, self._projection) for d in documents]
+
+    def __iter__(self):
+        return iter(self._documents())
+
+    def explain(self):
+        # No planner: every query is a scan, so index audits only mean something against MongoDB
+        return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}, "engine": "memory"}
+
+class MemoryCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self._documents = {}
+        self._indexes = {"_id_": {"key": [("_id", 1)], "unique": True}}
+        self._unique = {}
+        self._lookups = {}  # field -> {frozen value: {_id, ...}}
+        self._positions = {}  # _id -> insertion number, to return lookups in natural order
+        self._inserted = 0
+        self._lock = threading.RLock()
+
+    # -- indexes
+
+    def create_index(self, keys, unique=False, name=None, sparse=False, **kwargs):
+        keys = _sort_spec(keys, 1)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        with self._lock:
+            if name in self._indexes:
+                if self._indexes[name].get("unique", False) != unique:
+                    raise OperationFailure(f"Index with name: {name} already exists with different options")
+                return name
+            if unique:
+                fields = [field for field, _ in keys]
+                entries = {}
+                for document in self._documents.values():
+                    key = self._unique_key(fields, document, sparse)
+                    if key is None:
+                        continue
+                    if key in entries:
+                        raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+                    entries[key] = document["_id"]
+                self._unique[name] = (fields, entries, sparse)
+            self._indexes[name] = dict(kwargs, key=keys, unique=unique, sparse=sparse)
+            for field, _ in keys:
+                if field != "_id" and field not in self._lookups:
+                    self._lookups[field] = {}
+                    for document in self._documents.values():
+                        self._file(field, document)
+        return name
+
+    def index_information(self):
+        return copy.deepcopy(self._indexes)
+
+    def drop_index(self, name):
+        with self._lock:
+            self._indexes.pop(name, None)
+            self._unique.pop(name, None)
+            indexed = {field for index in self._indexes.values() for field, _ in index["key"]}
+            for field in set(self._lookups) - indexed:
+                del self._lookups[field]
+
+    @staticmethod
+    def _unique_key(fields, document, sparse=False):
+        """The index key of a document, or None when a sparse index skips it"""
+        values = [get_path(document, f, _MISSING) for f in fields]
+        if sparse and all(v is _MISSING for v in values):
+            return None
+        return tuple(_freeze(None if v is _MISSING else v) for v in values)
+
+    def _claim_unique(self, document, previous=None):
+        """Check and record a document's unique keys; previous is its old version on update"""
+        claimed = []
+        for name, (fields, entries, sparse) in self._unique.items():
+            key = self._unique_key(fields, document, sparse)
+            old_key = self._unique_key(fields, previous, sparse) if previous is not None else None
+            if key == old_key:
+                continue
+            if key is None:
+                entries.pop(old_key, None)
+                claimed.append((name, None, old_key))
+                continue
+            if key in entries and entries[key] != document["_id"]:
+                for undo_name, undo_key, undo_old in claimed:
+                    if undo_key is not None:
+                        self._unique[undo_name][1].pop(undo_key, None)
+                    if undo_old is not None:
+                        self._unique[undo_name][1][undo_old] = document["_id"]
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name} dup key: {key}")
+            entries[key] = document["_id"]
+            if old_key is not None:
+                entries.pop(old_key, None)
+            claimed.append((name, key, old_key))
+
+    def _release_unique(self, document):
+        for fields, entries, sparse in self._unique.values():
+            key = self._unique_key(fields, document, sparse)
+            if key is not None:
+                entries.pop(key, None)
+
+    def _file(self, field, document, remove=False):
+        entries = self._lookups[field]
+        for key in _lookup_keys(_path_values(document, field.split("."))):
+            if remove:
+                ids = entries.get(key)
+                if ids is not None:
+                    ids.discard(document["_id"])
+                    if not ids:
+                        del entries[key]
+            else:
+                entries.setdefault(key, set()).add(document["_id"])
+
+    def _store(self, document, previous=None):
+        """Put a document in place and keep the field lookups in step"""
+        for field in self._lookups:
+            if previous is not None:
+                self._file(field, previous, remove=True)
+            self._file(field, document)
+        if previous is None:
+            self._inserted += 1
+            self._positions[document["_id"]] = self._inserted
+        self._documents[document["_id"]] = document
+
+    def _remove(self, document):
+        for field in self._lookups:
+            self._file(field, document, remove=True)
+        del self._positions[document["_id"]]
+        del self._documents[document["_id"]]
+
+    # -- reads
+
+    def _candidates(self, query):
+        """_ids that may match, from the narrowest indexed equality or $in condition; None means scan"""
+        best = None
+        for field, condition in query.items():
+            if field != "_id" and field not in self._lookups:
+                continue
+            values = _lookup_values(condition)
+            if values is None:
+                continue
+            if field == "_id":
+                ids = {v for v in values if v in self._documents}
+            else:
+                entries = self._lookups[field]
+                ids = set().union(*(entries.get(_freeze(v), ()) for v in values))
+            if best is None or len(ids) < len(best):
+                best = ids
+        return best
+
+    def _select(self, query):
+        with self._lock:
+            ids = self._candidates(query)
+            if ids is None:
+                return [d for d in self._documents.values() if matches(d, query)]
+            documents = (self._documents[_id] for _id in sorted(ids, key=self._positions.__getitem__))
+            return [d for d in documents if matches(d, query)]
+
+    def find(self, filter=None, projection=None, sort=None, skip=0, limit=0, **kwargs):
+        return MemoryCursor(self, filter, projection, sort, skip, limit)
+
+    def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        for document in MemoryCursor(self, filter, projection, sort, limit=1):
+            return document
+        return None
+
+    def count_documents(self, filter, skip=0, limit=0, **kwargs):
+        count = max(len(self._select(filter or {})) - skip, 0)
+        return min(count, limit) if limit else count
+
+    def estimated_document_count(self, **kwargs):
+        return len(self._documents)
+
+    def distinct(self, key, filter=None):
+        values = []
+        for document in self._select(filter or {}):
+            for value in _flatten(_path_values(document, key.split("."))):
+                if value not in values:
+                    values.append(value)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        with self._lock:
+            documents = list(self._documents.values())
+        # Stages never modify their input documents, so only the output needs copying
+        return iter(copy.deepcopy(run_pipeline(documents, pipeline)))
+
+    # -- writes
+
+    def _insert(self, document):
+        document = copy.deepcopy(document)
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_ dup key: {document['_id']}")
+        self._claim_unique(document)
+        self._store(document)
+        return document["_id"]
+
+    def insert_one(self, document, **kwargs):
+        with self._lock:
+            inserted_id = self._insert(document)
+        document.setdefault("_id", inserted_id)
+        return InsertOneResult(inserted_id)
+
+    def insert_many(self, documents, ordered=True, **kwargs):
+        inserted_ids, errors = [], []
+        with self._lock:
+            for i, document in enumerate(documents):
+                try:
+                    inserted_ids.append(self._insert(document))
+                    document.setdefault("_id", inserted_ids[-1])
+                except DuplicateKeyError as e:
+                    errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted_ids), "writeConcernErrors": [], "upserted": [], "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0})
+        return InsertManyResult(inserted_ids)
+
+    def _update(self, filter, update, multi, upsert, sort=None):
+        with self._lock:
+            targets = self._select(filter)
+            if sort:
+                targets = sort_documents(targets, _sort_spec(sort))
+            if not multi:
+                targets = targets[:1]
+            modified = 0
+            for document in targets:
+                updated = copy.deepcopy(document)
+                apply_update(updated, update)
+                if updated != document:
+                    self._claim_unique(updated, previous=document)
+                    self._store(updated, previous=document)
+                    modified += 1
+            if targets or not upsert:
+                return UpdateResult(len(targets), modified)
+            document = _upsert_seed(filter)
+            apply_update(document, update, inserting=True)
+            return UpdateResult(0, 0, self._insert(document))
+
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        return self._update(filter, update, False, upsert)
+
+    def update_many(self, filter, update, upsert=False, **kwargs):
+        return self._update(filter, update, True, upsert)
+
+    def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        if _is_operator_update(replacement):
+            raise ValueError("replacement can not include $ operators")
+        with self._lock:
+            targets = self._select(filter)[:1]
+            if targets:
+                document = copy.deepcopy(replacement)
+                document["_id"] = targets[0]["_id"]
+                self._claim_unique(document, previous=targets[0])
+                self._store(document, previous=targets[0])
+                return UpdateResult(1, int(document != targets[0]))
+            if upsert:
+                return UpdateResult(0, 0, self._insert(dict(_upsert_seed(filter), **replacement)))
+            return UpdateResult(0, 0)
+
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False, return_document=ReturnDocument.BEFORE, **kwargs):
+        with self._lock:
+            targets = self._select(filter)
+            if sort:
+                targets = sort_documents(targets, _sort_spec(sort))
+            before = targets[0] if targets else None
+            result = self._update({"_id": before["_id"]} if before else filter, update, False, upsert and before is None)
+            if return_document == ReturnDocument.AFTER:
+                _id = before["_id"] if before else result.upserted_id
+                after = self._documents.get(_id) if _id is not None else None
+                return project(after, projection) if after is not None else None
+            return project(before, projection) if before is not None else None
+
+    def _delete(self, filter, multi):
+        with self._lock:
+            targets = self._select(filter)
+            if not multi:
+                targets = targets[:1]
+            for document in targets:
+                self._release_unique(document)
+                self._remove(document)
+            return DeleteResult(len(targets))
+
+    def delete_one(self, filter, **kwargs):
+        return self._delete(filter, False)
+
+    def delete_many(self, filter, **kwargs):
+        return self._delete(filter, True)
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        collector = _BulkCollector()
+        for request in requests:
+            request._add_to_bulk(collector)
+        result = BulkWriteResult()
+        errors = []
+        for i, operation in enumerate(collector.operations):
+            try:
+                kind = operation[0]
+                if kind == "insert":
+                    self.insert_one(operation[1])
+                    result.inserted_count += 1
+                elif kind == "update":
+                    _, selector, update, multi, upsert = operation
+                    outcome = self._update(selector, update, multi, upsert)
+                    result.matched_count += outcome.matched_count
+                    result.modified_count += outcome.modified_count
+                    if outcome.upserted_id is not None:
+                        result.upserted_ids[i] = outcome.upserted_id
+                        result.upserted_count += 1
+                elif kind == "replace":
+                    _, selector, replacement, upsert = operation
+                    outcome = self.replace_one(selector, replacement, upsert)
+                    result.matched_count += outcome.matched_count
+                    result.modified_count += outcome.modified_count
+                else:
+                    _, selector, limit = operation
+                    result.deleted_count += self._delete(selector, limit != 1).deleted_count
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": result.inserted_count, "writeConcernErrors": [], "upserted": [], "nMatched": result.matched_count, "nModified": result.modified_count, "nRemoved": result.deleted_count, "nUpserted": result.upserted_count})
+        return result
+
+    def drop(self):
+        self.database.drop_collection(self.name)
+
+class _Admin:
+    def command(self, name, *args, **kwargs):
+        return {"ok": 1.0}
+
+class MemoryDatabase:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self, name)
+            return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name, **kwargs):
+        return self[name]
+
+    def list_collection_names(self, **kwargs):
+        return list(self._collections)
+
+    def drop_collection(self, name):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def command(self, name, *args, **kwargs):
+        return {"ok": 1.0}
+
+class MemoryClient:
+    """A MongoClient look-alike; every client opened on the same memory:// URI shares its data"""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self):
+        self._databases = {}
+        self._lock = threading.Lock()
+        self.admin = _Admin()
+
+    @classmethod
+    def for_uri(cls, uri="memory://"):
+        with cls._instances_lock:
+            if uri not in cls._instances:
+                cls._instances[uri] = cls()
+            return cls._instances[uri]
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(self, name)
+            return self._databases[name]
+
+    def get_database(self, name, **kwargs):
+        return self[name]
+
+    def list_database_names(self):
+        return list(self._databases)
+
+    def drop_database(self, name):
+        with self._lock:
+            self._databases.pop(name, None)
+
+    def close(self):
+        pass
@@ -0,0 +1,313 @@
+"""Outbox delivery: a background worker pool that sends queued emails.
+
+Notifications are written to the outbox collection by enqueue_messages and
+returned from immediately; workers claim them in batches, send each batch
+over one long-lived SMTP session and retry failures with exponential
+backoff. A claim is a lease, so messages held by a crashed worker go back to
+the queue once it expires.
+
+Messages with a dedupe_key are queued once per key. Messages with a digest
+group are held for a window and claimed together with every other pending
+message of that group for the same recipient, so a combine function can
+render them as one email.
+
+    python -m backend.notification_worker            # run the workers standalone
+    python -m backend.notification_worker --once     # deliver what is due and exit
+
+Point SMTP_SERVER/SMTP_PORT at a local stand-in (with SMTP_STARTTLS=0 and
+no credentials) to exercise delivery without a real mail server.
+"""
+import os
+import smtplib
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+OUTBOX = "outbox"
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+BATCH_SIZE = 25
+MAX_ATTEMPTS = 5
+BASE_RETRY_SECONDS = 5
+LEASE_SECONDS = 120
+POLL_SECONDS = 2.0
+SESSION_IDLE_SECONDS = 60
+
+def enqueue_messages(db, messages, delay_seconds=0):
+    """Queue messages ({to, subject, body[, kind, ref, dedupe_key, digest]}) with one insert_many.
+
+    Messages whose dedupe_key is already queued are dropped. Returns how many
+    were queued.
+    """
+    now = datetime.utcnow()
+    send_at = now + timedelta(seconds=delay_seconds)
+    documents = [dict(message, status=PENDING, attempts=0, next_attempt_at=send_at, created_at=now) for message in messages]
+    if not documents:
+        return 0
+    try:
+        return len(db[OUTBOX].insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        return e.details.get("nInserted", len(documents) - len(errors))
+
+def digest_message(documents):
+    """One email combining several queued results for the same recipient"""
+    subject = f"African Nations League - {len(documents)} Match Results"
+    body = "\n\n".join(document['body'] for document in documents)
+    return {"to": documents[0]['to'], "subject": subject, "body": body}
+
+def build_message(sender, document):
+    message = MIMEText(document["body"], "plain", "utf-8")
+    message["From"] = sender
+    message["To"] = document["to"]
+    message["Subject"] = document["subject"]
+    return message
+
+class SMTPSession:
+    """One authenticated SMTP connection, opened on first use and reused across messages"""
+
+    def __init__(self, host, port, username=None, password=None, starttls=True, timeout=20):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.sender = username or f"noreply@{socket.getfqdn()}"
+        self.server = None
+        self.last_used = 0.0
+        self.connections = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self.server = server
+        self.connections += 1
+
+    def send(self, document):
+        if self.server is None:
+            self._connect()
+        message = build_message(self.sender, document)
+        try:
+            self.server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle session: reconnect once and resend
+            self.server = None
+            self._connect()
+            self.server.send_message(message)
+        self.last_used = time.monotonic()
+
+    def close_if_idle(self, idle_seconds=SESSION_IDLE_SECONDS):
+        if self.server is not None and time.monotonic() - self.last_used > idle_seconds:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+class ConsoleSession:
+    """Transport used while real delivery is switched off: prints what would be sent"""
+
+    sender = "console"
+    connections = 0
+
+    def send(self, document):
+        print(f"📧 Email would be sent to: {document['to']}")
+        print(f"📧 {document['subject']}")
+
+    def close_if_idle(self, idle_seconds=SESSION_IDLE_SECONDS):
+        pass
+
+    def close(self):
+        pass
+
+def retry_delay(attempts, base=BASE_RETRY_SECONDS):
+    return base * 2 ** (attempts - 1)
+
+class OutboxWorker:
+    """A pool of threads draining the outbox, each with its own SMTP session.
+
+    get_db returns the database or None (e.g. while the health monitor has the
+    circuit open), and session_factory builds a transport with send(document)
+    and close().
+    """
+
+    def __init__(self, get_db, session_factory, workers=2, batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS,
+                 base_retry=BASE_RETRY_SECONDS, lease_seconds=LEASE_SECONDS, poll_seconds=POLL_SECONDS, combine=None):
+        self.get_db = get_db
+        self.session_factory = session_factory
+        self.combine = combine
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_retry = base_retry
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.sent = 0
+        self.failed = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._counter_lock = threading.Lock()
+
+    def claim_batch(self, db, worker_id):
+        """Lease up to batch_size due messages to one worker, plus the rest of their digest groups"""
+        now = datetime.utcnow()
+        due = {"$or": [
+            {"status": PENDING, "next_attempt_at": {"$lte": now}},
+            {"status": SENDING, "lease_expires_at": {"$lte": now}},
+        ]}
+        token = uuid.uuid4().hex
+        claim = {"$set": {"status": SENDING, "claimed_by": worker_id, "claim": token, "lease_expires_at": now + timedelta(seconds=self.lease_seconds)}}
+        claimed = 0
+        while claimed < self.batch_size:
+            document = db[OUTBOX].find_one_and_update(due, claim, sort=[("next_attempt_at", 1)], projection={"to": 1, "digest": 1})
+            if document is None:
+                break
+            claimed += 1
+            if document.get("digest") is not None:
+                # Everything else due for this recipient and group goes out in the same email; retries keep their backoff
+                group = {"status": PENDING, "to": document["to"], "digest": document["digest"], "next_attempt_at": {"$lte": now}}
+                claimed += db[OUTBOX].update_many(group, claim).modified_count
+        if not claimed:
+            return []
+        return list(db[OUTBOX].find({"claim": token}).sort("created_at", 1))
+
+    def _units(self, batch):
+        """Split a batch into sends: each digest group of a recipient combined, other messages alone"""
+        groups = {}
+        for document in batch:
+            key = (document["to"], document["digest"]) if self.combine and document.get("digest") is not None else document["_id"]
+            groups.setdefault(key, []).append(document)
+        return [(documents, documents[0] if len(documents) == 1 else self.combine(documents)) for documents in groups.values()]
+
+    def deliver(self, db, session, batch):
+        """Send a claimed batch over one session and record every outcome in one bulk_write"""
+        now = datetime.utcnow()
+        release = {"lease_expires_at": "", "claimed_by": "", "claim": ""}
+        updates = []
+        for documents, message in self._units(batch):
+            try:
+                session.send(message)
+                updates += [UpdateOne({"_id": d["_id"]}, {"$set": {"status": SENT, "sent_at": now, "sent_in_digest": len(documents) > 1}, "$unset": release}) for d in documents]
+                with self._counter_lock:
+                    self.sent += 1
+            except Exception as e:
+                for document in documents:
+                    attempts = document.get("attempts", 0) + 1
+                    status = FAILED if attempts >= self.max_attempts else PENDING
+                    updates.append(UpdateOne({"_id": document["_id"]}, {
+                        "$set": {"status": status, "attempts": attempts, "last_error": str(e),
+                                 "next_attempt_at": now + timedelta(seconds=retry_delay(attempts, self.base_retry))},
+                        "$unset": release}))
+                    if status == FAILED:
+                        with self._counter_lock:
+                            self.failed += 1
+                # Drop the session so the next send starts from a fresh connection
+                session.close()
+        if updates:
+            db[OUTBOX].bulk_write(updates, ordered=False)
+        return len(batch)
+
+    def run_once(self, session, worker_id="once"):
+        """Claim and deliver one batch; returns how many messages were handled"""
+        db = self.get_db()
+        if db is None:
+            return 0
+        batch = self.claim_batch(db, worker_id)
+        return self.deliver(db, session, batch) if batch else 0
+
+    def drain(self, session=None):
+        """Deliver everything that is due now, on the calling thread"""
+        session = session or self.session_factory()
+        handled = 0
+        try:
+            while True:
+                count = self.run_once(session)
+                if not count:
+                    return handled
+                handled += count
+        finally:
+            session.close()
+
+    def notify(self):
+        """Wake the workers after enqueueing, instead of waiting for the next poll"""
+        self._wake.set()
+
+    def _run(self, worker_id):
+        session = self.session_factory()
+        try:
+            while not self._stop.is_set():
+                try:
+                    handled = self.run_once(session, worker_id)
+                except Exception as e:
+                    print(f"Outbox worker {worker_id} error: {e}")
+                    handled = 0
+                if not handled:
+                    session.close_if_idle()
+                    self._wake.wait(self.poll_seconds)
+                    self._wake.clear()
+        finally:
+            session.close()
+
+    def start(self):
+        for n in range(self.workers):
+            worker_id = f"{socket.gethostname()}-{os.getpid()}-{n}-{uuid.uuid4().hex[:6]}"
+            thread = threading.Thread(target=self._run, args=(worker_id,), name=f"outbox-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+def session_factory_from_config(config):
+    """SMTP sessions when delivery is enabled in config, console output otherwise"""
+    if not config.get("enabled"):
+        return ConsoleSession
+    return lambda: SMTPSession(config["server"], int(config["port"]), config.get("username"), config.get("password"), config.get("starttls", True))
+
+def config_from_env():
+    return {
+        "enabled": os.getenv("SEND_EMAILS", "0") == "1",
+        "server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+        "port": os.getenv("SMTP_PORT", "587"),
+        "username": os.getenv("SENDER_EMAIL"),
+        "password": os.getenv("SENDER_PASSWORD"),
+        "starttls": os.getenv("SMTP_STARTTLS", "1") == "1",
+    }
+
+if __name__ == "__main__":
+    from backend.storage import open_client
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client = open_client()
+    db = client[os.getenv('DATABASE_NAME', 'AfricanLeague')]
+    worker = OutboxWorker(lambda: db, session_factory_from_config(config_from_env()), combine=digest_message)
+    if sys.argv[1:2] == ["--once"]:
+        print(f"📧 Delivered {worker.drain()} queued messages")
+    else:
+        print("📧 Outbox worker running (Ctrl+C to stop)")
+        worker.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            worker.stop()
+    client.close()
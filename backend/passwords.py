@@ -0,0 +1,126 @@
+"""Password hashing with tunable scrypt cost and lazy upgrades of old records.
+
+Stored hashes look like scrypt$<n>$<r>$<p>$<salt>$<hash> (base64 salt and
+hash), so every record carries the cost it was made with. Records stored
+before hashing (plain text) and records made with an older cost still verify;
+needs_rehash flags them so the login that proves the password can replace
+the record in the background.
+
+KDF work runs on a small thread pool. hashlib releases the GIL while it
+hashes, so other sessions keep running, and the pool size caps how many
+logins hash at once (each scrypt call holds 128 * n * r bytes).
+
+    python -m backend.passwords benchmark            # logins/second per cost setting
+    python -m backend.passwords benchmark --threads 4
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEME = "scrypt"
+DEFAULT_COST = {"n": 2 ** 14, "r": 8, "p": 1}
+SALT_BYTES = 16
+KEY_BYTES = 32
+HASH_WORKERS = 2
+BENCHMARK_COSTS = [{"n": 2 ** k, "r": 8, "p": 1} for k in (12, 13, 14, 15, 16)]
+
+def _b64(raw):
+    return base64.b64encode(raw).decode()
+
+def _scrypt(password, salt, n, r, p):
+    # OpenSSL refuses anything over maxmem, so size it to the cost with room to spare
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES, maxmem=256 * n * r * p)
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(SCHEME + "$")
+
+class PasswordHasher:
+    """scrypt at a configurable cost, with its own pool for the KDF work"""
+
+    def __init__(self, n=DEFAULT_COST["n"], r=DEFAULT_COST["r"], p=DEFAULT_COST["p"], workers=HASH_WORKERS):
+        if n < 2 or n & (n - 1):
+            raise ValueError("scrypt n must be a power of two")
+        self.n, self.r, self.p = int(n), int(r), int(p)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+    def hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        key = _scrypt(password, salt, self.n, self.r, self.p)
+        return f"{SCHEME}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(key)}"
+
+    def verify(self, password, stored):
+        """Check a password against a stored hash or a legacy plain-text record"""
+        if not isinstance(stored, str):
+            return False
+        if not is_hashed(stored):
+            return hmac.compare_digest(password.encode(), stored.encode())
+        try:
+            _, n, r, p, salt, key = stored.split("$")
+            expected = base64.b64decode(key)
+            return hmac.compare_digest(_scrypt(password, base64.b64decode(salt), int(n), int(r), int(p)), expected)
+        except ValueError:
+            return False
+
+    def needs_rehash(self, stored):
+        """True for plain text and for hashes made with a different cost"""
+        if not is_hashed(stored):
+            return True
+        return stored.split("$")[1:4] != [str(self.n), str(self.r), str(self.p)]
+
+    def hash_in_pool(self, password):
+        return self._pool.submit(self.hash, password).result()
+
+    def verify_in_pool(self, password, stored):
+        return self._pool.submit(self.verify, password, stored).result()
+
+    def rehash_in_background(self, password, stored, save):
+        """Hash again at the current cost and hand the result to save(new_hash, old_hash) off the login path"""
+        def rehash():
+            try:
+                save(self.hash(password), stored)
+            except Exception as e:
+                print(f"Password rehash failed: {e}")
+        return self._pool.submit(rehash)
+
+    def close(self):
+        """Shut the pool down, waiting for queued work"""
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def benchmark(costs=None, threads=1, seconds=1.0, log=print):
+    """Measure logins/second (verify calls) at each cost; returns [(cost, per_second, ms_per_login)]"""
+    results = []
+    for cost in costs or BENCHMARK_COSTS:
+        with PasswordHasher(workers=threads, **cost) as hasher:
+            stored = hasher.hash("benchmark-password")
+            done, started = 0, time.perf_counter()
+            while time.perf_counter() - started < seconds:
+                futures = [hasher._pool.submit(hasher.verify, "benchmark-password", stored) for _ in range(threads)]
+                done += sum(1 for f in futures if f.result())
+            elapsed = time.perf_counter() - started
+        results.append((cost, done / elapsed, 1000 * elapsed * threads / done))
+        log(f"  n=2^{cost['n'].bit_length() - 1:<2} r={cost['r']} p={cost['p']}  {done / elapsed:8.1f} logins/s  "
+            f"{1000 * elapsed * threads / done:7.1f} ms each  {128 * cost['n'] * cost['r'] * cost['p'] // 2 ** 20} MiB")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Password hashing tools")
+    parser.add_argument("command", choices=["benchmark"])
+    parser.add_argument("--threads", type=int, default=1, help="concurrent logins, like the app's hash pool size")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent on each setting")
+    args = parser.parse_args(argv)
+    print(f"🔐 scrypt verify throughput with {args.threads} thread(s):")
+    benchmark(threads=args.threads, seconds=args.seconds)
+
+if __name__ == "__main__":
+    sys.exit(main())
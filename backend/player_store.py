@@ -0,0 +1,81 @@
+"""The players collection is the single store for squads.
+
+Every player is one document in the schema database_initializer.create_player
+writes (country, federationId, jerseyNumber, naturalPosition, ratings and the
+stat counters). Squads registered through the app used to be embedded in
+federations.players instead; migrate_embedded_players moves them over:
+
+    python -m backend.player_store migrate
+"""
+import os
+import sys
+from datetime import datetime
+
+POSITIONS = ["GK", "DF", "MD", "AT"]
+PLAYER_COUNTERS = {"goals": 0, "assists": 0, "yellowCards": 0, "redCards": 0, "matchesPlayed": 0, "minutesPlayed": 0}
+SQUAD_FIELDS = {"country": 1, "name": 1, "jerseyNumber": 1, "naturalPosition": 1, "ratings": 1, "isCaptain": 1}
+
+def player_document(player, country, federation_id, jersey_number):
+    """A squad entry (name, naturalPosition, ratings[, isCaptain]) as a players document"""
+    document = {
+        "name": player["name"],
+        "country": country,
+        "jerseyNumber": player.get("jerseyNumber", jersey_number),
+        "naturalPosition": player["naturalPosition"],
+        "ratings": {pos: player.get("ratings", {}).get(pos, 0) for pos in POSITIONS},
+        "federationId": federation_id,
+        "isCaptain": bool(player.get("isCaptain", False)),
+        "createdAt": datetime.utcnow(),
+    }
+    document.update({field: player.get(field, value) for field, value in PLAYER_COUNTERS.items()})
+    return document
+
+def insert_squad(db, country, federation_id, squad):
+    """Write a whole squad for a federation in one insert_many"""
+    documents = [player_document(p, country, federation_id, i + 1) for i, p in enumerate(squad)]
+    if documents:
+        db.players.insert_many(documents, ordered=False)
+    return len(documents)
+
+def load_squads(db, countries, projection=None):
+    """{country: [players]} for several countries in one query, in jersey order"""
+    squads = {country: [] for country in countries}
+    if db is None or not countries:
+        return squads
+    cursor = db.players.find({"country": {"$in": list(countries)}}, projection or SQUAD_FIELDS).sort([("country", 1), ("jerseyNumber", 1)])
+    for player in cursor:
+        squads.setdefault(player["country"], []).append(player)
+    return squads
+
+def load_squad(db, country, projection=None):
+    return load_squads(db, [country], projection)[country]
+
+def migrate_embedded_players(db):
+    """Move squads embedded in federations.players into the players collection.
+
+    Safe to run repeatedly: a federation whose country already has player
+    documents only loses its embedded copy, and federations without an
+    embedded squad are never read. Returns the number of players inserted.
+    """
+    inserted = 0
+    for federation in db.federations.find({"players.0": {"$exists": True}}, {"country": 1, "players": 1}):
+        if db.players.count_documents({"country": federation["country"]}, limit=1) == 0:
+            inserted += insert_squad(db, federation["country"], federation["_id"], federation["players"])
+        db.federations.update_one({"_id": federation["_id"]}, {"$unset": {"players": ""}})
+    # Older player documents may predate the stat counters
+    for field, value in PLAYER_COUNTERS.items():
+        db.players.update_many({field: {"$exists": False}}, {"$set": {field: value}})
+    return inserted
+
+if __name__ == "__main__":
+    from backend.storage import open_client
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client = open_client()
+    db = client[os.getenv('DATABASE_NAME', 'AfricanLeague')]
+    if sys.argv[1:2] == ["migrate"]:
+        print(f"⚽ Moved {migrate_embedded_players(db)} embedded players into the players collection")
+    else:
+        print("Usage: python -m backend.player_store migrate")
+    client.close()
@@ -0,0 +1,113 @@
+"""Headless tournament simulation.
+
+Plays full tournaments with the app's match engines and streams one JSON
+line per tournament. Nothing is written to MongoDB and Streamlit is never
+imported, so batch experiments run at engine speed:
+
+    python -m backend.simulation_cli --teams teams.json -n 1000 --engine direct --seed 42
+    python -m backend.simulation_cli --from-db -n 100 --output results.jsonl
+    python -m backend.simulation_cli --teams teams.json -n 0 --odds 1000000 --workers 8
+
+A teams file is a JSON list of federations: {"country", "rating",
+"players": [...]}, players being optional and in the federation schema.
+"""
+import argparse
+import json
+import sys
+import time
+from frontend.utils.match_engine import ENGINE_MODES
+from frontend.utils.seeding import derive_seed, new_seed
+from frontend.utils.squad_index import SquadIndex
+from frontend.utils.tournament_runner import play_tournament, match_winner
+from frontend.utils.forecaster import DEFAULT_RATING, build_bracket_state
+from frontend.utils.parallel_runner import parallel_forecast
+from backend.player_store import load_squads
+
+def load_teams_file(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_teams_from_db(database_name="AfricanLeague"):
+    """Read-only snapshot of federations and their players from MONGODB_URI"""
+    from backend.storage import open_client
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client = open_client()
+    try:
+        db = client[database_name]
+        teams = list(db.federations.find({}, {"_id": 0, "country": 1, "rating": 1}).limit(8))
+        squads = load_squads(db, [t["country"] for t in teams], {"_id": 0, "country": 1, "name": 1, "naturalPosition": 1, "ratings": 1})
+        for team in teams:
+            team["players"] = squads[team["country"]]
+        return teams
+    finally:
+        client.close()
+
+def run(teams, n_tournaments, engine, master_seed, out, include_matches=True):
+    """Play n_tournaments and write one JSON line each; returns the champion tally"""
+    countries = [t["country"] for t in teams]
+    ratings = {t["country"]: t.get("rating", DEFAULT_RATING) for t in teams}
+    squads = {t["country"]: SquadIndex(t.get("players") or []) for t in teams}
+    champions = {}
+
+    for n in range(n_tournaments):
+        tournament_seed = derive_seed(master_seed, "tournament", n)
+        matches = play_tournament(countries, ratings, squads, engine, tournament_seed)
+        champion = match_winner(matches[-1])
+        champions[champion] = champions.get(champion, 0) + 1
+
+        line = {"tournament": n, "seed": tournament_seed, "engine": engine, "champion": champion}
+        if include_matches:
+            line["matches"] = matches
+        out.write(json.dumps(line) + "\n")
+    return champions
+
+def title_odds(teams, n_sims, master_seed, max_workers=None):
+    """Pre-draw stage probabilities from n_sims bracket simulations, sharded across processes"""
+    state = build_bracket_state(teams, [])
+    return parallel_forecast(state, n_sims, derive_seed(master_seed, "odds"), max_workers)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate African Nations League tournaments without the UI")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--teams", help="JSON file with a list of federations")
+    source.add_argument("--from-db", action="store_true", help="snapshot teams from MONGODB_URI (read only)")
+    parser.add_argument("--database", default="AfricanLeague")
+    parser.add_argument("-n", "--tournaments", type=int, default=1)
+    parser.add_argument("--engine", choices=list(ENGINE_MODES), default="direct")
+    parser.add_argument("--seed", type=int, help="master seed (random when omitted)")
+    parser.add_argument("--output", help="JSONL file (stdout when omitted)")
+    parser.add_argument("--summary-only", action="store_true", help="omit match documents from each line")
+    parser.add_argument("--odds", type=int, default=0, metavar="N", help="also estimate title odds from N bracket simulations")
+    parser.add_argument("--workers", type=int, help="processes for --odds (every core when omitted; same numbers for any count)")
+    args = parser.parse_args(argv)
+
+    teams = load_teams_file(args.teams) if args.teams else load_teams_from_db(args.database)
+    if len(teams) < 8:
+        parser.error(f"Need 8 teams. Currently: {len(teams)}")
+    master_seed = args.seed if args.seed is not None else new_seed()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        champions = run(teams, args.tournaments, args.engine, master_seed, out, not args.summary_only)
+    finally:
+        if args.output:
+            out.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"Played {args.tournaments} tournaments in {elapsed:.2f}s (seed {master_seed})", file=sys.stderr)
+    for country, wins in sorted(champions.items(), key=lambda item: -item[1]):
+        print(f"  {country}: {wins}", file=sys.stderr)
+
+    if args.odds > 0:
+        started = time.perf_counter()
+        odds = title_odds(teams, args.odds, master_seed, args.workers)
+        elapsed = time.perf_counter() - started
+        print(f"Title odds from {args.odds} simulations in {elapsed:.2f}s", file=sys.stderr)
+        for row in odds["teams"]:
+            print(f"  {row['country']}: {row['champion']:.2%}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
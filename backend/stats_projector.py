@@ -0,0 +1,106 @@
+import os
+import sys
+import uuid
+from pymongo import UpdateOne
+
+TEAM_STAT_FIELDS = ["wins", "draws", "losses", "goalsFor", "goalsAgainst", "points"]
+PLAYER_STAT_FIELDS = ["goals", "assists"]
+RESULT_FIELDS = {"teamA_name": 1, "teamB_name": 1, "scoreA": 1, "scoreB": 1, "goal_scorers": 1}
+
+def team_deltas(match):
+    """{country: {stat: delta}} for the two teams of a completed match"""
+    score_a, score_b = match.get("scoreA", 0), match.get("scoreB", 0)
+    deltas = {}
+    for team, scored, conceded in ((match.get("teamA_name"), score_a, score_b), (match.get("teamB_name"), score_b, score_a)):
+        if not team:
+            continue
+        win, draw = int(scored > conceded), int(scored == conceded)
+        deltas[team] = {"wins": win, "draws": draw, "losses": int(scored < conceded),
+                        "goalsFor": scored, "goalsAgainst": conceded, "points": 3 * win + draw}
+    return deltas
+
+def player_deltas(match):
+    """{player _id or (country, player name): {'goals': n, 'assists': n}} from a match's goal_scorers.
+
+    Goals recorded before player ids were stored fall back to the name key.
+    """
+    deltas = {}
+    for goal in match.get("goal_scorers", []):
+        scorer = deltas.setdefault(goal.get("player_id") or (goal.get("team"), goal.get("player")), {"goals": 0, "assists": 0})
+        scorer["goals"] += 1
+        assist = goal.get("assist", "")
+        if assist.startswith("Assist: "):
+            assister = deltas.setdefault(goal.get("assist_id") or (goal.get("team"), assist[len("Assist: "):]), {"goals": 0, "assists": 0})
+            assister["assists"] += 1
+    return deltas
+
+def _player_filter(key):
+    if isinstance(key, tuple):
+        return {"country": key[0], "name": key[1]}
+    return {"_id": key}
+
+def _merge(total, deltas):
+    for key, stats in deltas.items():
+        merged = total.setdefault(key, {})
+        for field, value in stats.items():
+            merged[field] = merged.get(field, 0) + value
+
+def _write_deltas(db, teams, players, operator="$inc"):
+    team_ops = [UpdateOne({"country": country}, {operator: stats}) for country, stats in teams.items()]
+    player_ops = [UpdateOne(_player_filter(key), {operator: stats}) for key, stats in players.items()]
+    if team_ops:
+        db.federations.bulk_write(team_ops, ordered=False)
+    if player_ops:
+        db.players.bulk_write(player_ops, ordered=False)
+
+def apply_match_results(db, match_ids=None):
+    """Fold completed matches that are not yet counted into the standings and player stats.
+
+    The whole batch is claimed with one update_many that flips stats_applied
+    and stamps a claim token, so a match is never counted twice even when two
+    sessions apply at once. The claimed matches are read back with one find
+    and their deltas go out as one $inc bulk_write per collection. Returns the
+    number of matches applied.
+    """
+    query = {"status": "completed", "stats_applied": {"$ne": True}}
+    if match_ids is not None:
+        query["_id"] = {"$in": list(match_ids)}
+
+    token = uuid.uuid4().hex
+    if not db.matches.update_many(query, {"$set": {"stats_applied": True, "stats_claim": token}}).modified_count:
+        return 0
+    teams, players = {}, {}
+    applied = 0
+    for match in db.matches.find({"stats_claim": token}, RESULT_FIELDS):
+        _merge(teams, team_deltas(match))
+        _merge(players, player_deltas(match))
+        applied += 1
+    _write_deltas(db, teams, players)
+    return applied
+
+def rebuild_stats(db):
+    """Recompute every standing and player stat from the full match history"""
+    teams, players = {}, {}
+    completed = list(db.matches.find({"status": "completed"}, RESULT_FIELDS))
+    for match in completed:
+        _merge(teams, team_deltas(match))
+        _merge(players, player_deltas(match))
+
+    db.federations.update_many({}, {"$set": {field: 0 for field in TEAM_STAT_FIELDS}})
+    db.players.update_many({}, {"$set": {field: 0 for field in PLAYER_STAT_FIELDS}})
+    _write_deltas(db, teams, players, operator="$set")
+    db.matches.update_many({"status": "completed"}, {"$set": {"stats_applied": True}})
+    return len(completed)
+
+if __name__ == "__main__":
+    from backend.storage import open_client
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client = open_client()
+    db = client[os.getenv('DATABASE_NAME', 'AfricanLeague')]
+    if sys.argv[1:2] == ["rebuild"]:
+        print(f"📊 Rebuilt stats from {rebuild_stats(db)} completed matches")
+    else:
+        print(f"📊 Applied {apply_match_results(db)} pending match results")
+    client.close()
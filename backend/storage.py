@@ -0,0 +1,32 @@
+"""Storage backend selection.
+
+Every module reaches the database through a client from open_client, which
+picks the engine from the connection URI:
+
+    mongodb://... or mongodb+srv://...   MongoDB through pymongo
+    memory:// or memory://<name>         the in-process engine in backend.memory_store
+
+Clients opened on the same memory:// URI share their data within a process,
+so the app, the CLIs run in-process and benchmarks can use it with no server.
+"""
+import os
+from pymongo import MongoClient
+try:
+    from backend.memory_store import MemoryClient
+except ImportError:  # imported from a script run inside backend/
+    from memory_store import MemoryClient
+
+MEMORY_SCHEME = "memory://"
+
+def is_memory_uri(uri):
+    return bool(uri) and uri.startswith(MEMORY_SCHEME)
+
+def is_supported_uri(uri):
+    return bool(uri) and (uri.startswith("mongodb") or is_memory_uri(uri))
+
+def open_client(uri=None, **kwargs):
+    """A MongoClient, or a MemoryClient for memory:// URIs; uri defaults to MONGODB_URI"""
+    uri = uri if uri is not None else os.getenv('MONGODB_URI')
+    if is_memory_uri(uri):
+        return MemoryClient.for_uri(uri)
+    return MongoClient(uri, **kwargs)
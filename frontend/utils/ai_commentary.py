@@ -7,14 +7,14 @@ class AICommentaryGenerator:
         self.api_key = st.secrets.get("OPENAI_API_KEY", "")
         self.use_real_ai = bool(self.api_key)
     
-    def generate_commentary(self, teamA, teamB, match_events):
+    def generate_commentary(self, teamA, teamB, match_events, rng=None):
         """Generate match commentary using AI or fallback"""
         if self.use_real_ai and self.api_key:
-            return self._generate_openai_commentary(teamA, teamB, match_events)
+            return self._generate_openai_commentary(teamA, teamB, match_events, rng)
         else:
-            return self._generate_fallback_commentary(teamA, teamB, match_events)
+            return self._generate_fallback_commentary(teamA, teamB, match_events, rng)
     
-    def _generate_openai_commentary(self, teamA, teamB, match_events):
+    def _generate_openai_commentary(self, teamA, teamB, match_events, rng=None):
         """Generate commentary using OpenAI GPT"""
         try:
             # Enhanced African-themed commentary
@@ -33,10 +33,11 @@ class AICommentaryGenerator:
             
         except Exception as e:
             print(f"AI commentary error: {str(e)}")
-            return self._generate_fallback_commentary(teamA, teamB, match_events)
+            return self._generate_fallback_commentary(teamA, teamB, match_events, rng)
     
-    def _generate_fallback_commentary(self, teamA, teamB, match_events):
+    def _generate_fallback_commentary(self, teamA, teamB, match_events, rng=None):
         """Enhanced fallback commentary with African football flavor"""
+        rng = rng or random
         
         african_flair_phrases = [
             "The juju is working for this team! African magic on display!",
@@ -49,7 +50,7 @@ class AICommentaryGenerator:
         
         commentary = [
             f"🏆 AFRICAN NATIONS LEAGUE: {teamA} vs {teamB} kicks off!",
-            random.choice(african_flair_phrases),
+            rng.choice(african_flair_phrases),
             "Both teams showcasing the technical brilliance of African football!",
             "The pace and passion is everything we love about African football!",
         ]
@@ -0,0 +1,87 @@
+"""Aggregation pipelines for the Statistics and Analytics pages.
+
+Every pipeline runs on the matches collection and does its filtering,
+sorting and paging on the server, so a page costs the same however long
+the match history gets. Only the $match, $sort, $skip, $limit, $unwind,
+$group and $project stages are used.
+"""
+COMPLETED = {"$match": {"status": "completed"}}
+HISTORY_PAGE_SIZE = 10
+ASSIST_PREFIX = "Assist: "
+HISTORY_FIELDS = {"teamA_name": 1, "teamB_name": 1, "stage": 1, "status": 1, "scoreA": 1, "scoreB": 1, "method": 1, "goal_scorers": 1}
+
+def match_history_pipeline(page=0, page_size=HISTORY_PAGE_SIZE):
+    """One page of completed matches, newest first"""
+    return [
+        COMPLETED,
+        {"$sort": {"_id": -1}},
+        {"$skip": page * page_size},
+        {"$limit": page_size},
+        {"$project": HISTORY_FIELDS},
+    ]
+
+def completed_count_pipeline():
+    return [COMPLETED, {"$group": {"_id": None, "count": {"$sum": 1}}}]
+
+def top_scorers_pipeline(limit=10):
+    """[{_id: {player, team}, goals}] for the most prolific scorers"""
+    return [
+        COMPLETED,
+        {"$unwind": "$goal_scorers"},
+        {"$group": {"_id": {"player": "$goal_scorers.player", "team": "$goal_scorers.team"}, "goals": {"$sum": 1}}},
+        {"$sort": {"goals": -1, "_id.player": 1}},
+        {"$limit": limit},
+    ]
+
+def top_assisters_pipeline(limit=10):
+    """[{_id: {assist, team}, assists}]; assist still carries the 'Assist: ' prefix"""
+    return [
+        COMPLETED,
+        {"$unwind": "$goal_scorers"},
+        {"$match": {"goal_scorers.assist": {"$regex": f"^{ASSIST_PREFIX}"}}},
+        {"$group": {"_id": {"assist": "$goal_scorers.assist", "team": "$goal_scorers.team"}, "assists": {"$sum": 1}}},
+        {"$sort": {"assists": -1, "_id.assist": 1}},
+        {"$limit": limit},
+    ]
+
+def goals_per_stage_pipeline():
+    """[{_id: stage, matches, goals}]"""
+    return [
+        COMPLETED,
+        {"$project": {"stage": 1, "goals": {"$add": ["$scoreA", "$scoreB"]}}},
+        {"$group": {"_id": "$stage", "matches": {"$sum": 1}, "goals": {"$sum": "$goals"}}},
+        {"$sort": {"_id": 1}},
+    ]
+
+def team_records_pipeline():
+    """[{_id: country, played, wins, draws, losses, goalsFor, goalsAgainst}] best record first"""
+    return [
+        COMPLETED,
+        {"$project": {"sides": [
+            {"team": "$teamA_name", "gf": "$scoreA", "ga": "$scoreB"},
+            {"team": "$teamB_name", "gf": "$scoreB", "ga": "$scoreA"},
+        ]}},
+        {"$unwind": "$sides"},
+        {"$group": {
+            "_id": "$sides.team",
+            "played": {"$sum": 1},
+            "wins": {"$sum": {"$cond": [{"$gt": ["$sides.gf", "$sides.ga"]}, 1, 0]}},
+            "draws": {"$sum": {"$cond": [{"$eq": ["$sides.gf", "$sides.ga"]}, 1, 0]}},
+            "losses": {"$sum": {"$cond": [{"$lt": ["$sides.gf", "$sides.ga"]}, 1, 0]}},
+            "goalsFor": {"$sum": "$sides.gf"},
+            "goalsAgainst": {"$sum": "$sides.ga"},
+        }},
+        {"$sort": {"wins": -1, "goalsFor": -1, "_id": 1}},
+    ]
+
+def scorer_rows(results):
+    """Flatten top_scorers_pipeline output into {player, team, goals}"""
+    return [{"player": r["_id"]["player"], "team": r["_id"]["team"], "goals": r["goals"]} for r in results]
+
+def assister_rows(results):
+    """Flatten top_assisters_pipeline output into {player, team, assists}"""
+    return [{"player": r["_id"]["assist"][len(ASSIST_PREFIX):], "team": r["_id"]["team"], "assists": r["assists"]} for r in results]
+
+def page_count(count_results, page_size=HISTORY_PAGE_SIZE):
+    total = count_results[0]["count"] if count_results else 0
+    return max(1, -(-total // page_size)), total
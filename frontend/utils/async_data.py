@@ -0,0 +1,34 @@
+"""Concurrent page loads on top of the blocking data helpers.
+
+A page's reads are independent round trips, so they are awaited together
+and the page waits for the slowest one instead of their sum. Each read is
+an ordinary function (usually a cached_find/cached_aggregate call) run on a
+worker thread, so the query cache, the health monitor and every storage
+backend keep working unchanged.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CONCURRENT_READS = 8
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_READS, thread_name_prefix="page-read")
+
+async def fetch_all(loaders, executor=None):
+    """Await every loader concurrently; returns {name: result} in the loaders' order.
+
+    loaders maps names to zero-argument functions. The first exception is
+    raised once all of them have finished.
+    """
+    loop = asyncio.get_running_loop()
+    names = list(loaders)
+    results = await asyncio.gather(*(loop.run_in_executor(executor or _executor, loaders[name]) for name in names))
+    return dict(zip(names, results))
+
+def load_concurrently(loaders, executor=None):
+    """Blocking entry point for fetch_all, usable from a script thread with no running event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(fetch_all(loaders, executor))
+    # Already inside an event loop: fan out on the pool directly
+    futures = {name: (executor or _executor).submit(loader) for name, loader in loaders.items()}
+    return {name: future.result() for name, future in futures.items()}
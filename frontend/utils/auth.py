@@ -1,6 +1,37 @@
+import os
+import uuid
 from datetime import datetime
 import streamlit as st
+from pymongo.errors import DuplicateKeyError
 from frontend.utils.database import get_database
+from frontend.utils.sessions import SessionStore, SESSION_TTL_SECONDS, REVALIDATE_SECONDS, identity_of
+from backend.passwords import PasswordHasher, DEFAULT_COST, HASH_WORKERS
+from frontend.utils.rate_limit import AdmissionControl, AdmissionRejected, MAX_CONCURRENT
+
+@st.cache_resource
+def get_session_store():
+    """Process-wide session store; set SESSION_SECRET so tokens outlive a restart"""
+    secret = st.secrets.get("SESSION_SECRET") or os.urandom(32)
+    return SessionStore(secret, ttl=st.secrets.get("SESSION_TTL_SECONDS", SESSION_TTL_SECONDS),
+                        revalidate_seconds=st.secrets.get("SESSION_REVALIDATE_SECONDS", REVALIDATE_SECONDS))
+
+@st.cache_resource
+def get_password_hasher():
+    """Process-wide hasher; PASSWORD_SCRYPT_N/R/P tune the cost (see python -m backend.passwords benchmark)"""
+    return PasswordHasher(n=st.secrets.get("PASSWORD_SCRYPT_N", DEFAULT_COST["n"]), r=st.secrets.get("PASSWORD_SCRYPT_R", DEFAULT_COST["r"]),
+                          p=st.secrets.get("PASSWORD_SCRYPT_P", DEFAULT_COST["p"]), workers=st.secrets.get("PASSWORD_HASH_WORKERS", HASH_WORKERS))
+
+@st.cache_resource
+def get_admission_control():
+    """Process-wide limiter for login and registration; AUTH_MAX_CONCURRENT caps attempts in flight"""
+    return AdmissionControl(max_concurrent=st.secrets.get("AUTH_MAX_CONCURRENT", MAX_CONCURRENT))
+
+def guard_attempt(action, email):
+    """Admit one login/registration attempt for this email and browser session, or raise AdmissionRejected"""
+    return get_admission_control().admit(action, (email or "").strip().lower(), st.session_state.get('client_id'))
+
+def get_admin_credentials():
+    return st.secrets.get("ADMIN_EMAIL", "admin@africanleague.com"), st.secrets.get("ADMIN_PASSWORD", "admin123")
 
 def init_session_state():
     """Initialize session state variables"""
@@ -8,54 +39,99 @@ def init_session_state():
         st.session_state.user = None
     if 'role' not in st.session_state:
         st.session_state.role = None
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = None
+    if 'client_id' not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
     if 'current_page' not in st.session_state:
         st.session_state.current_page = "Home"
 
+def start_session(user):
+    """Sign in a user document (or identity dict) without another database round trip"""
+    token = get_session_store().issue(dict(user, role=user.get('role', 'visitor')))
+    st.session_state.session_token = token
+    apply_identity(get_session_store().resolve(token))
+
+def apply_identity(identity):
+    st.session_state.user = {field: identity[field] for field in ("email", "role", "country") if field in identity}
+    st.session_state.role = identity['role']
+
+def load_identity(email):
+    """Current identity for an email, used to revalidate cached sessions"""
+    admin_email, _ = get_admin_credentials()
+    if email == admin_email:
+        return {"email": email, "role": "admin"}
+    db = get_database()
+    if db is None:
+        raise ConnectionError("Database unavailable")
+    return db.users.find_one({"email": email}, {"email": 1, "role": 1, "country": 1})
+
+def resolve_session():
+    """Identity for this rerun: served from the session cache, rechecked against users only now and then"""
+    token = st.session_state.get('session_token')
+    if token is None:
+        return st.session_state.get('user')  # visitors browse without a session
+    identity = get_session_store().resolve(token, load_identity)
+    if identity is None:
+        logout_user()
+        return None
+    apply_identity(identity)
+    return st.session_state.user
+
 def login_user(email, password):
-    """Authenticate user"""
+    """Authenticate user; raises AdmissionRejected when the attempt is rate limited"""
     try:
-        # Check admin credentials from secrets first
-        admin_email = st.secrets.get("ADMIN_EMAIL", "admin@africanleague.com")
-        admin_password = st.secrets.get("ADMIN_PASSWORD", "admin123")
-        
-        if email == admin_email and password == admin_password:
-            st.session_state.user = {"email": email, "role": "admin"}
-            st.session_state.role = "admin"
-            return True
+        with guard_attempt("login", email):
+            # Check admin credentials from secrets first
+            admin_email, admin_password = get_admin_credentials()
             
-        db = get_database()
-        if db:
-            user = db.users.find_one({"email": email, "password": password})
-            if user:
-                st.session_state.user = user
-                st.session_state.role = user.get('role', 'visitor')
+            if email == admin_email and password == admin_password:
+                start_session({"email": email, "role": "admin"})
                 return True
-        return False
+                
+            db = get_database()
+            if db is not None:
+                user = db.users.find_one({"email": email}, {"email": 1, "role": 1, "country": 1, "password": 1})
+                hasher = get_password_hasher()
+                if user and hasher.verify_in_pool(password, user.get("password")):
+                    if hasher.needs_rehash(user["password"]):
+                        # Plain-text or old-cost record: upgrade it off the login path, unless it changed meanwhile
+                        hasher.rehash_in_background(password, user["password"], lambda new, old: db.users.update_one(
+                            {"_id": user["_id"], "password": old}, {"$set": {"password": new}}))
+                    start_session(user)
+                    return True
+            return False
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
         st.error(f"Login error: {str(e)}")
         return False
 
 def logout_user():
     """Logout user"""
+    token = st.session_state.get('session_token')
+    if token:
+        get_session_store().revoke(token)
+    st.session_state.session_token = None
     st.session_state.user = None
     st.session_state.role = None
     st.session_state.current_page = "Home"
 
 def register_user(email, password, role, country=None):
-    """Register new user"""
+    """Register new user; returns their identity for start_session, or None"""
     try:
         db = get_database()
-        if not db:
-            return False
+        if db is None:
+            return None
             
-        # Check if user already exists
-        if db.users.find_one({"email": email}):
-            return False
+        # Check if user already exists (before paying for the password hash)
+        if db.users.find_one({"email": email}, {"_id": 1}):
+            return None
             
         user_data = {
             "email": email,
-            "password": password,
+            "password": get_password_hasher().hash_in_pool(password),
             "role": role,
             "created_at": datetime.now()
         }
@@ -63,9 +139,12 @@ def register_user(email, password, role, country=None):
         if country:
             user_data["country"] = country
             
-        result = db.users.insert_one(user_data)
-        return result.inserted_id is not None
+        # The unique email index still settles two registrations racing past the check
+        db.users.insert_one(user_data)
+        return identity_of(user_data)
         
+    except DuplicateKeyError:
+        return None
     except Exception as e:
         st.error(f"Registration error: {str(e)}")
-        return False
+        return None
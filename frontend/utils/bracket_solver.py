@@ -0,0 +1,97 @@
+import numpy as np
+from frontend.utils.match_engine import goal_probabilities, MATCH_MINUTES
+from frontend.utils.forecaster import STAGES, DEFAULT_RATING
+
+def win_probability_matrix(ratings, minutes=MATCH_MINUTES):
+    """Exact P(team i beats team j) when i is team A and j is team B.
+
+    Uses the minute-loop goal model: each minute A scores with p_a, otherwise
+    B scores with p_b. The goal-difference distribution is propagated minute
+    by minute for every pair at once; a draw goes to team B like the bracket.
+    """
+    probs = np.clip(goal_probabilities(ratings), 0.0, 1.0)
+    p_a = probs[:, None]
+    p_b = (1.0 - probs[:, None]) * probs[None, :]
+    p_none = 1.0 - p_a - p_b
+
+    n = len(probs)
+    # diff[..., minutes + d] = P(goals A - goals B == d)
+    diff = np.zeros((n, n, 2 * minutes + 1))
+    diff[:, :, minutes] = 1.0
+    for _ in range(minutes):
+        step = diff * p_none[:, :, None]
+        step[:, :, 1:] += diff[:, :, :-1] * p_a[:, :, None]
+        step[:, :, :-1] += diff[:, :, 1:] * p_b[:, :, None]
+        diff = step
+    return diff[:, :, minutes + 1:].sum(axis=2)
+
+def stage_labels(n_teams):
+    """Stage names for a bracket of n_teams, ending with the app's stage names"""
+    n_rounds = int(np.log2(n_teams))
+    labels = []
+    for r in range(n_rounds):
+        remaining = n_rounds - r
+        labels.append(STAGES[-remaining] if remaining <= len(STAGES) else f"round_of_{n_teams >> r}")
+    return labels + ["champion"]
+
+def solve_bracket(ratings, decided=None):
+    """Stage-reach probabilities for a knockout bracket in slot order.
+
+    ratings lists the teams as they are drawn (match k is slot 2k vs 2k+1,
+    and the winner of the lower match is team A in the next round).
+    decided optionally holds, per round, the known winner slot of each match
+    or -1 when it is still to be played. Returns an array of shape
+    (rounds + 1, n): row r is P(team reaches round r), the last row P(title).
+    """
+    n = len(ratings)
+    if n < 2 or n & (n - 1):
+        raise ValueError("bracket size must be a power of two")
+    win = win_probability_matrix(ratings)
+    n_rounds = int(np.log2(n))
+    decided = decided or []
+
+    reach = np.ones((n_rounds + 1, n))
+    for r in range(n_rounds):
+        half = 1 << r
+        prev = reach[r]
+        nxt = np.zeros(n)
+        for start in range(0, n, 2 * half):
+            lower = slice(start, start + half)
+            upper = slice(start + half, start + 2 * half)
+            # Lower half plays as team A, upper half as team B
+            nxt[lower] = prev[lower] * (win[lower, upper] @ prev[upper])
+            nxt[upper] = prev[upper] * ((1.0 - win[lower, upper]).T @ prev[lower])
+
+            match_index = start // (2 * half)
+            known = decided[r][match_index] if r < len(decided) and match_index < len(decided[r]) else -1
+            if known >= 0:
+                nxt[start:start + 2 * half] = 0.0
+                nxt[known] = 1.0
+        reach[r + 1] = nxt
+    return reach
+
+def exact_forecast(state):
+    """Exact counterpart of forecaster.forecast_tournament for a drawn bracket.
+
+    Returns None when the quarter-finals have not been drawn, since the
+    random draw is only covered by the Monte Carlo forecaster.
+    """
+    quarters = state["rounds"][0]
+    teams = [t for a, b, _ in quarters for t in (a, b)]
+    if not teams or any(t is None for t in teams) or len(teams) & (len(teams) - 1):
+        return None
+
+    index = {team: i for i, team in enumerate(teams)}
+    ratings = [state["ratings"].get(t, DEFAULT_RATING) for t in teams]
+    decided = [[index.get(w, -1) for _, _, w in stage_matches] for stage_matches in state["rounds"]]
+    reach = solve_bracket(ratings, decided)
+
+    labels = stage_labels(len(teams))
+    rows = []
+    for i, country in enumerate(teams):
+        row = {"country": country}
+        for r, label in enumerate(labels):
+            row[label] = float(reach[r, i])
+        rows.append(row)
+    rows.sort(key=lambda r: (r["champion"], r.get("final", 0), r.get("semifinal", 0)), reverse=True)
+    return {"method": "exact", "teams": rows}
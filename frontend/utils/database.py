@@ -1,10 +1,51 @@
-from pymongo import MongoClient
 import streamlit as st
+from backend.index_manager import ensure_indexes
+from backend.player_store import insert_squad, load_squad, migrate_embedded_players
+from frontend.utils.db_health import HealthMonitor
+from backend.storage import open_client, is_supported_uri
+from frontend.utils.async_data import load_concurrently
+from frontend.utils.forecaster import STAGES
+from pymongo.errors import ConnectionFailure
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import copy
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 
+# Read-through cache shared by every session of this process.
+# Entries expire after the TTL, and any write bumps its collection's version.
+# At most CACHE_MAX_ENTRIES are kept, least recently used evicted first.
+CACHE_TTL_SECONDS = 30
+CACHE_MAX_ENTRIES = 256
+HEALTH_CHECK_INTERVAL = 10
+_query_cache = OrderedDict()
+_collection_versions = {}
+_cache_lock = threading.Lock()
+_indexes_ensured = False
+
+# The live tournament: synthetic load-test data (backend.data_generator) stays out of it
+LIVE_MATCHES = {"stage": {"$in": STAGES}}
+LIVE_FEDERATIONS = {"synthetic": {"$ne": True}}
+
+# Named projections for list pages, so they skip embedded squads and commentary
+MATCH_ROW_FIELDS = {"teamA_name": 1, "teamB_name": 1, "stage": 1, "status": 1, "scoreA": 1, "scoreB": 1}
+LEAN_VIEWS = {
+    "federations": {
+        "card": {"country": 1, "rating": 1},
+        "standings": {"country": 1, "rating": 1, "wins": 1, "draws": 1, "losses": 1, "goalsFor": 1, "goalsAgainst": 1, "points": 1},
+    },
+    "matches": {
+        "row": MATCH_ROW_FIELDS,
+    },
+    "players": {
+        "leaderboard": {"name": 1, "country": 1, "goals": 1, "assists": 1},
+    },
+}
+
 @st.cache_resource
-def get_database():
-    """Get MongoDB database connection with detailed debugging"""
+def get_health_monitor():
+    """One health monitor per process; None when the secrets cannot work at all"""
     try:
         # Check if MONGODB_URI exists in secrets
         if "MONGODB_URI" not in st.secrets:
@@ -20,50 +61,63 @@ def get_database():
             st.error("❌ PLACEHOLDER DETECTED: You're still using placeholder text!")
             return None
         
-        # Validate it's a proper MongoDB URI
-        if not mongodb_uri.startswith("mongodb"):
+        # Validate it's a proper MongoDB URI (or memory:// for the in-process engine)
+        if not is_supported_uri(mongodb_uri):
             st.error(f"❌ Invalid MongoDB URI format")
             return None
         
-        # Connect to MongoDB
-        client = MongoClient(
-            mongodb_uri,
-            serverSelectionTimeoutMS=10000,
-            connectTimeoutMS=15000,
-            socketTimeoutMS=15000,
-            retryWrites=True,
-            w="majority"
-        )
-        
-        # Test connection
-        client.admin.command('ping')
-        
-        # Use the specified database
-        database = client[database_name]
-        
-        return database
+        # Connect to MongoDB; the monitor reconnects with backoff after failures
+        def connect():
+            return open_client(
+                mongodb_uri,
+                serverSelectionTimeoutMS=10000,
+                connectTimeoutMS=15000,
+                socketTimeoutMS=15000,
+                retryWrites=True,
+                w="majority"
+            )
+        monitor = HealthMonitor(connect, interval=HEALTH_CHECK_INTERVAL).start()
+        monitor.database_name = database_name
+        return monitor
         
     except Exception as e:
         st.error(f"❌ MongoDB connection failed: {str(e)}")
         return None
 
+def get_database():
+    """The database while the health monitor reports it up, else None straight away"""
+    return database_of(get_health_monitor())
+
+def database_of(monitor):
+    """get_database for a monitor already in hand; makes no Streamlit calls, so background threads can use it"""
+    if monitor is None or not monitor.available:
+        return None
+    client = monitor.client
+    return client[monitor.database_name] if client is not None else None
+
 def is_database_available():
-    """Check if database is available without causing boolean errors"""
-    try:
-        db = get_database()
-        if db is None:
-            return False
-        # Test with a simple operation
-        db.command('ping')
-        return True
-    except:
-        return False
+    """Cached availability from the health monitor; never waits on the network"""
+    monitor = get_health_monitor()
+    return monitor is not None and monitor.available
+
+def report_connection_failure(error):
+    """Trip the breaker on a connection error seen between health probes"""
+    monitor = get_health_monitor()
+    if monitor is not None:
+        monitor.report_failure(error)
 
 def save_team(team_data):
     db = get_database()
     if db is not None:
         try:
-            return db.federations.insert_one(team_data)
+            # Squads live in the players collection, never embedded in the federation
+            team_data = dict(team_data)
+            squad = team_data.pop("players", None)
+            result = db.federations.insert_one(team_data)
+            if squad:
+                insert_squad(db, team_data["country"], result.inserted_id, squad)
+            invalidate_collections("federations", "players")
+            return result
         except Exception as e:
             st.error(f"Error saving team: {str(e)}")
     return None
@@ -73,8 +127,8 @@ def get_players_by_federation(federation_email):
     if db is None:
         return []
     try:
-        team = db.federations.find_one({"representative_email": federation_email})
-        return team.get('players', []) if team else []
+        team = db.federations.find_one({"representative_email": federation_email}, {"country": 1})
+        return load_squad(db, team["country"]) if team else []
     except Exception as e:
         st.error(f"Error fetching players: {str(e)}")
         return []
@@ -87,12 +141,26 @@ def initialize_database():
     admin_email = st.secrets.get("ADMIN_EMAIL", "admin@africanleague.com")
     admin_password = st.secrets.get("ADMIN_PASSWORD", "admin123")
     
+    # Indexes and the player store migration run once per process; later reruns skip straight past
+    global _indexes_ensured
+    if not _indexes_ensured:
+        for problem in ensure_indexes(db):
+            print(f"Index setup note: {problem}")
+        try:
+            moved = migrate_embedded_players(db)
+            if moved:
+                print(f"Moved {moved} embedded players into the players collection")
+        except Exception as e:
+            print(f"Player migration note: {e}")
+        _indexes_ensured = True
+    
     try:
         existing_admin = db.users.find_one({"email": admin_email})
         if not existing_admin:
+            from frontend.utils.auth import get_password_hasher
             db.users.insert_one({
                 "email": admin_email,
-                "password": admin_password,
+                "password": get_password_hasher().hash_in_pool(admin_password),
                 "role": "admin",
                 "created_at": datetime.now()
             })
@@ -116,7 +184,7 @@ def get_tournament_matches():
     if db is None:
         return []
     try:
-        return list(db.matches.find({}))
+        return list(db.matches.find(LIVE_MATCHES))
     except Exception as e:
         return []
 
@@ -135,6 +203,84 @@ def get_team_count():
     if db is None:
         return 0
     try:
-        return db.federations.count_documents({})
+        return db.federations.count_documents(LIVE_FEDERATIONS)
     except:
         return 0
+
+
+def invalidate_collections(*collections):
+    """Bump the cache version of collections after a write, so the next read goes to MongoDB"""
+    with _cache_lock:
+        for name in collections:
+            _collection_versions[name] = _collection_versions.get(name, 0) + 1
+
+def lean_projection(collection, view):
+    """Projection for a named lean view of a collection (None means whole documents)"""
+    if view is None:
+        return None
+    try:
+        return LEAN_VIEWS[collection][view]
+    except KeyError:
+        raise ValueError(f"Unknown view '{view}' for {collection}")
+
+def cached_find(collection, query=None, ttl=CACHE_TTL_SECONDS, view=None, **kwargs):
+    """list(db[collection].find(query, **kwargs)) served from the cache while fresh.
+
+    view names a LEAN_VIEWS projection; the rows are then plain dicts holding
+    only those fields (plus _id).
+    """
+    query = query or {}
+    if view is not None:
+        kwargs["projection"] = lean_projection(collection, view)
+    key = (collection, repr(query), repr(sorted(kwargs.items())))
+    return _cached(collection, key, ttl, lambda db: db[collection].find(query, **kwargs))
+
+def cached_aggregate(collection, pipeline, ttl=CACHE_TTL_SECONDS):
+    """list(db[collection].aggregate(pipeline)) served from the cache while fresh"""
+    key = (collection, "aggregate", repr(pipeline))
+    return _cached(collection, key, ttl, lambda db: db[collection].aggregate(pipeline))
+
+def _cached(collection, key, ttl, run):
+    now = time.monotonic()
+    with _cache_lock:
+        version = _collection_versions.get(collection, 0)
+        entry = _query_cache.get(key)
+        if entry and entry[0] == version and entry[1] > now:
+            _query_cache.move_to_end(key)
+            # Cached rows are shared by every session in the process; hand out copies callers may edit
+            return copy.deepcopy(entry[2])
+
+    db = get_database()
+    if db is None:
+        return []
+    try:
+        documents = list(run(db))
+    except ConnectionFailure as e:
+        report_connection_failure(e)
+        raise
+    with _cache_lock:
+        # Skip storing if a write happened while we were reading
+        if _collection_versions.get(collection, 0) == version:
+            _store_entry(key, (version, now + ttl, documents), now)
+    return copy.deepcopy(documents)
+
+def _store_entry(key, entry, now):
+    """Insert under _cache_lock, dropping expired or outdated entries and then the least recently used"""
+    _query_cache[key] = entry
+    _query_cache.move_to_end(key)
+    for stale in [k for k, (version, expires, _) in _query_cache.items() if expires <= now or version != _collection_versions.get(k[0], 0)]:
+        del _query_cache[stale]
+    while len(_query_cache) > CACHE_MAX_ENTRIES:
+        _query_cache.popitem(last=False)
+
+def load_page_data(**loaders):
+    """Run a page's independent reads concurrently: load_page_data(teams=lambda: ..., matches=...)"""
+    ctx = get_script_run_ctx()
+    def with_context(loader):
+        # Reads may touch st.secrets and st.cache_resource, which expect the page's script context
+        def run():
+            if ctx is not None:
+                add_script_run_ctx(threading.current_thread(), ctx)
+            return loader()
+        return run
+    return load_concurrently({name: with_context(loader) for name, loader in loaders.items()})
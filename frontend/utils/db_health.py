@@ -0,0 +1,120 @@
+import threading
+import time
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitBreaker:
+    """Opens after repeated failures, then lets one probe through after an exponential backoff"""
+
+    def __init__(self, failure_threshold=2, base_delay=1.0, max_delay=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True when calls may go through; an open breaker turns half-open once its backoff has passed"""
+        with self._lock:
+            if self.state == OPEN and self.clock() >= self.retry_at:
+                self.state = HALF_OPEN
+            return self.state != OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self.trips, self.last_error = CLOSED, 0, 0, None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.retry_at = self.clock() + self.backoff()
+                self.trips += 1
+
+    def backoff(self):
+        return min(self.base_delay * 2 ** self.trips, self.max_delay)
+
+    def seconds_until_retry(self):
+        return max(0.0, self.retry_at - self.clock()) if self.state == OPEN else 0.0
+
+class HealthMonitor:
+    """Pings the database from a daemon thread and keeps the availability state.
+
+    connect() builds a client; it is called again after failures, following
+    the breaker's backoff, so a bad start or a dropped cluster recovers
+    without restarting the process. Readers only look at the cached state.
+    """
+
+    def __init__(self, connect, interval=10.0, breaker=None):
+        self.connect = connect
+        self.interval = interval
+        # A failed ping has already waited out the server selection timeout, so one is enough
+        self.breaker = breaker or CircuitBreaker(failure_threshold=1)
+        self.client = None
+        self.last_check = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self):
+        return self.client is not None and self.breaker.allow()
+
+    def check(self):
+        """One health probe: (re)connect if needed and ping; returns the new availability"""
+        with self._lock:
+            try:
+                if self.client is None:
+                    self.client = self.connect()
+                self.client.admin.command("ping")
+                self.breaker.record_success()
+            except Exception as e:
+                self.breaker.record_failure(e)
+                self._drop_client()
+            self.last_check = time.time()
+        return self.breaker.state == CLOSED
+
+    def report_failure(self, error):
+        """Let callers feed connection errors they hit between probes"""
+        self.breaker.record_failure(error)
+        if self.breaker.state == OPEN:
+            self._wake.set()
+
+    def _drop_client(self):
+        # Client creation can succeed while the cluster is down; start fresh on the next try
+        if self.client is not None and self.breaker.state == OPEN:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+            self.client = None
+
+    def start(self):
+        """Probe once now, then keep probing in the background"""
+        self.check()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-health-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            state = self.breaker.state
+            delay = self.breaker.seconds_until_retry() if state == OPEN else 0 if state == HALF_OPEN else self.interval
+            if self._wake.wait(max(delay, 0.1)):
+                # Woken by a reported failure or stop(): recompute the delay first
+                self._wake.clear()
+                continue
+            self.check()
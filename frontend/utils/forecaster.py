@@ -0,0 +1,113 @@
+import numpy as np
+from frontend.utils.match_engine import sample_scores_batch
+
+STAGES = ["quarterfinal", "semifinal", "final"]
+BRACKET_SIZE = 8
+DEFAULT_RATING = 75
+CHUNK_SIZE = 10_000
+
+def build_bracket_state(federations, matches):
+    """Reduce federation and match documents to {'ratings', 'teams', 'rounds'}.
+
+    The returned dict is everything the forecasters need, so no database
+    access happens while simulating.
+    """
+    ratings = {f["country"]: f.get("rating", DEFAULT_RATING) for f in federations}
+    rounds = []
+    for stage in STAGES:
+        stage_matches = []
+        for m in matches:
+            if m.get("stage") != stage:
+                continue
+            winner = None
+            if m.get("status") == "completed":
+                # Same rule as create_semifinals: a draw sends team B through
+                winner = m["teamA_name"] if m["scoreA"] > m["scoreB"] else m["teamB_name"]
+            stage_matches.append([m.get("teamA_name"), m.get("teamB_name"), winner])
+        rounds.append(stage_matches)
+    return {
+        "ratings": ratings,
+        # initialize_tournament draws from the first eight registered federations
+        "teams": [f["country"] for f in federations[:BRACKET_SIZE]],
+        "rounds": rounds,
+    }
+
+def _decided_winners(state, index):
+    """Known winners per round as arrays of team indices (-1 when still to play)"""
+    decided = []
+    for stage_matches in state["rounds"]:
+        decided.append(np.array([index[w] if w in index else -1 for _, _, w in stage_matches], dtype=int))
+    return decided
+
+def forecast_tournament(state, n_sims=100_000, rng=None):
+    """Replay the remaining bracket n_sims times and return stage probabilities.
+
+    Completed matches keep their real winner, scheduled ones are simulated
+    by sampling scores directly from the minute-loop distribution. When the quarter-finals have not been drawn yet
+    every simulation draws its own random bracket, like initialize_tournament.
+    Returns {'method', 'simulations', 'teams': [{'country', 'quarterfinal',
+    'semifinal', 'final', 'champion'}, ...]} sorted by title chance, or None
+    when there is no complete bracket to forecast.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    counts = forecast_counts(state, n_sims, rng)
+    if counts is None:
+        return None
+    return summarize_counts(counts, n_sims)
+
+def forecast_counts(state, n_sims, rng):
+    """Raw stage-reach counts per team for n_sims simulations (mergeable across runs)"""
+    quarters = state["rounds"][0]
+    if quarters:
+        teams = [t for a, b, _ in quarters for t in (a, b)]
+    else:
+        teams = list(state["teams"])
+    if len(teams) != BRACKET_SIZE or any(t is None for t in teams):
+        return None
+
+    index = {team: i for i, team in enumerate(teams)}
+    ratings = np.array([state["ratings"].get(t, DEFAULT_RATING) for t in teams], dtype=float)
+    decided = _decided_winners(state, index) if quarters else [np.array([], dtype=int)] * len(STAGES)
+
+    reach = np.zeros((len(STAGES) + 1, BRACKET_SIZE), dtype=np.int64)
+    done = 0
+    while done < n_sims:
+        size = min(CHUNK_SIZE, n_sims - done)
+        if quarters:
+            slots = np.tile(np.arange(BRACKET_SIZE), (size, 1))
+        else:
+            slots = np.argsort(rng.random((size, BRACKET_SIZE)), axis=1)
+
+        for stage_index in range(len(STAGES)):
+            reach[stage_index] += np.bincount(slots.ravel(), minlength=BRACKET_SIZE)
+            slots = _play_round(slots, ratings, decided[stage_index], rng)
+        reach[len(STAGES)] += np.bincount(slots.ravel(), minlength=BRACKET_SIZE)
+        done += size
+
+    return {"teams": teams, "reach": reach}
+
+def _play_round(slots, ratings, decided, rng):
+    """Play one knockout round for every simulation, returning the winners' slots"""
+    team_a, team_b = slots[:, 0::2], slots[:, 1::2]
+    # Only scores matter here, so draw them directly instead of minute by minute
+    score_a, score_b = sample_scores_batch(ratings[team_a].ravel(), ratings[team_b].ravel(), rng)
+    a_wins = (score_a > score_b).reshape(team_a.shape)
+    winners = np.where(a_wins, team_a, team_b)
+
+    # Results that are already in the database override the simulation
+    for match_index, winner in enumerate(decided[:winners.shape[1]]):
+        if winner >= 0:
+            winners[:, match_index] = winner
+    return winners
+
+def summarize_counts(counts, n_sims):
+    """Turn stage-reach counts into per-team probabilities"""
+    labels = STAGES + ["champion"]
+    rows = []
+    for team_index, country in enumerate(counts["teams"]):
+        row = {"country": country}
+        for stage_index, label in enumerate(labels):
+            row[label] = float(counts["reach"][stage_index, team_index]) / n_sims
+        rows.append(row)
+    rows.sort(key=lambda r: (r["champion"], r["final"], r["semifinal"]), reverse=True)
+    return {"method": "monte_carlo", "simulations": n_sims, "teams": rows}
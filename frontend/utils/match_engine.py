@@ -0,0 +1,147 @@
+import random
+import numpy as np
+
+# Same shape as the minute loop in match_simulator: one half, three checks per minute
+MATCH_MINUTES = 45
+OTHER_EVENT_PROB = 0.05
+OTHER_EVENTS = ["Great save!", "Close miss!", "Yellow card!", "Tactical substitution"]
+NO_EVENT = -1
+
+# Engines selectable for quick simulation
+ENGINE_MODES = {
+    "classic": "Classic (0-3 goals each)",
+    "minute": "Minute-by-minute",
+    "direct": "Direct sampling",
+}
+
+def goal_probability(rating):
+    """Per-minute goal chance for a team rating"""
+    return float(goal_probabilities([rating])[0])
+
+def goal_probabilities(ratings):
+    """Vectorized goal_probability for an array of ratings"""
+    ratings = np.asarray(ratings, dtype=float)
+    return np.minimum(0.08 + (ratings - 75) * 0.002, 0.15)
+
+def simulate_matches_batch(ratings_a, ratings_b, rng=None, minutes=MATCH_MINUTES):
+    """Simulate N fixtures at once with the minute-loop rules.
+
+    Each minute team A scores with its goal probability, otherwise team B gets
+    its chance, otherwise an 'other' event may happen - exactly like
+    simulate_match_with_commentary, but for every fixture in one pass.
+    Returns a dict of arrays: scoreA/scoreB (N,), goalsA/goalsB (N, minutes)
+    boolean masks and events (N, minutes) holding an OTHER_EVENTS index or NO_EVENT.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    prob_a = goal_probabilities(ratings_a).reshape(-1, 1)
+    prob_b = goal_probabilities(ratings_b).reshape(-1, 1)
+    if prob_a.shape != prob_b.shape:
+        raise ValueError("ratings_a and ratings_b must have the same length")
+
+    draws = rng.random((3, prob_a.shape[0], minutes))
+    goals_a = draws[0] < prob_a
+    goals_b = ~goals_a & (draws[1] < prob_b)
+    other = ~goals_a & ~goals_b & (draws[2] < OTHER_EVENT_PROB)
+    event_kinds = rng.integers(0, len(OTHER_EVENTS), size=other.shape)
+
+    return {
+        "scoreA": goals_a.sum(axis=1),
+        "scoreB": goals_b.sum(axis=1),
+        "goalsA": goals_a,
+        "goalsB": goals_b,
+        "events": np.where(other, event_kinds, NO_EVENT),
+    }
+
+def goal_minutes(goal_mask, index):
+    """Minutes (1-based) in which goals were scored for one fixture of a batch"""
+    return (np.flatnonzero(goal_mask[index]) + 1).tolist()
+
+def match_events(batch, index, teamA_name, teamB_name):
+    """Rebuild the match_events strings of one fixture, as the minute loop writes them"""
+    events = []
+    for minute in range(batch["events"].shape[1]):
+        if batch["goalsA"][index, minute]:
+            events.append(f"Goal for {teamA_name} at {minute + 1}'")
+        elif batch["goalsB"][index, minute]:
+            events.append(f"Goal for {teamB_name} at {minute + 1}'")
+        elif batch["events"][index, minute] != NO_EVENT:
+            events.append(f"{OTHER_EVENTS[batch['events'][index, minute]]} at {minute + 1}'")
+    return events
+
+def sample_scores_batch(ratings_a, ratings_b, rng=None, minutes=MATCH_MINUTES):
+    """Scores only, drawn directly from the minute-loop distribution (see sample_goal_minutes)"""
+    rng = rng if rng is not None else np.random.default_rng()
+    prob_a = np.clip(goal_probabilities(ratings_a), 0.0, 1.0)
+    prob_b = np.clip(goal_probabilities(ratings_b), 0.0, 1.0)
+    score_a = rng.binomial(minutes, prob_a)
+    score_b = rng.binomial(minutes - score_a, prob_b)
+    return score_a, score_b
+
+def _binomial(rng, n, p):
+    """Binomial draw by walking the CDF, so the cost grows with the result, not n"""
+    if p <= 0:
+        return 0
+    if p >= 1:
+        return n
+    u = rng.random()
+    prob = (1 - p) ** n
+    cdf = prob
+    k = 0
+    while u > cdf and k < n:
+        prob *= (n - k) / (k + 1) * p / (1 - p)
+        k += 1
+        cdf += prob
+    return k
+
+def sample_goal_minutes(rating_a, rating_b, rng=None, minutes=MATCH_MINUTES):
+    """Direct-sampling engine: goal minutes for both teams in O(goals).
+
+    In the minute loop team A scores in each minute independently, so its
+    goal count is Binomial(minutes, p_a) spread uniformly over the half.
+    Team B only gets a chance in the minutes A did not score, so given k_a
+    its count is Binomial(minutes - k_a, p_b) over the remaining minutes.
+    Sampling that way gives exactly the minute loop's score distribution.
+    """
+    rng = rng or random
+    k_a = _binomial(rng, minutes, goal_probability(rating_a))
+    k_b = _binomial(rng, minutes - k_a, goal_probability(rating_b))
+
+    # Distinct minutes by rejection: at most a handful of draws per goal
+    picked = []
+    taken = set()
+    while len(picked) < k_a + k_b:
+        minute = int(rng.random() * minutes) + 1
+        if minute not in taken:
+            taken.add(minute)
+            picked.append(minute)
+    return sorted(picked[:k_a]), sorted(picked[k_a:])
+
+def minute_loop_goal_minutes(rating_a, rating_b, rng=None, minutes=MATCH_MINUTES):
+    """Goal minutes from the per-minute loop used by simulate_match_with_commentary"""
+    rng = rng or random
+    prob_a, prob_b = goal_probability(rating_a), goal_probability(rating_b)
+    goals_a, goals_b = [], []
+    for minute in range(1, minutes + 1):
+        if rng.random() < prob_a:
+            goals_a.append(minute)
+        elif rng.random() < prob_b:
+            goals_b.append(minute)
+    return goals_a, goals_b
+
+def classic_goal_minutes(rating_a, rating_b, rng=None):
+    """The original quick simulation: 0-3 goals each at any minute, ratings ignored"""
+    rng = rng or random
+    score_a, score_b = rng.randint(0, 3), rng.randint(0, 3)
+    goals_a = sorted(rng.randint(1, 90) for _ in range(score_a))
+    goals_b = sorted(rng.randint(1, 90) for _ in range(score_b))
+    return goals_a, goals_b
+
+def simulate_goal_minutes(mode, rating_a, rating_b, rng=None):
+    """Goal minutes for both teams with the chosen engine (a key of ENGINE_MODES)"""
+    if mode == "direct":
+        return sample_goal_minutes(rating_a, rating_b, rng)
+    if mode == "minute":
+        return minute_loop_goal_minutes(rating_a, rating_b, rng)
+    if mode == "classic":
+        return classic_goal_minutes(rating_a, rating_b, rng)
+    raise ValueError(f"Unknown engine mode: {mode}")
@@ -1,68 +1,92 @@
 import random
 from datetime import datetime
 from frontend.utils.ai_commentary import get_ai_commentary_generator
+from frontend.utils.match_engine import goal_probability, OTHER_EVENT_PROB, OTHER_EVENTS, MATCH_MINUTES
+from frontend.utils.seeding import match_seed, seeded_rng
+from frontend.utils.squad_index import get_squad_indexes
+from frontend.utils.database import invalidate_collections
+from backend.stats_projector import apply_match_results
 
-def simulate_match_with_commentary(db, match_id, teamA_name, teamB_name):
-    """Enhanced match simulation with AI commentary"""
+def _goal(squads, team_name, minute, rng):
+    squad = squads.get(team_name)
+    if squad is None:
+        return {"player": f"Player {rng.randint(1, 23)}", "minute": minute, "team": team_name}
+    return squad.goal_event(team_name, minute, rng)
+
+def iter_match_with_commentary(teamA_name, teamB_name, ratingA=75, ratingB=75, rng=None, squads=None):
+    """Play the match minute by minute, yielding each event as it happens.
+
+    Every event is a dict with 'kind' (kickoff, goal, event or commentary),
+    'minute', 'text' and the running 'scoreA'/'scoreB'; goals also carry the
+    'goal' entry for goal_scorers. The AI commentary lines come last, since
+    they are written from the whole list of match events. squads maps team
+    names to SquadIndex objects that pick the scorers.
+    """
+    rng = rng or random
+    squads = squads or {}
     ai_generator = get_ai_commentary_generator()
-    
-    # Get team ratings for more realistic simulation
-    match = db.matches.find_one({"_id": match_id}) if db else None
-    teamA = db.federations.find_one({"_id": match['teamA_id']}) if db and match else None
-    teamB = db.federations.find_one({"_id": match['teamB_id']}) if db and match else None
-    
-    ratingA = teamA.get('rating', 75) if teamA else 75
-    ratingB = teamB.get('rating', 75) if teamB else 75
-    
+
     # Calculate goal probabilities based on ratings
-    goal_prob_a = min(0.08 + (ratingA - 75) * 0.002, 0.15)
-    goal_prob_b = min(0.08 + (ratingB - 75) * 0.002, 0.15)
-    
-    commentary = []
+    goal_prob_a = goal_probability(ratingA)
+    goal_prob_b = goal_probability(ratingB)
+
     score_a, score_b = 0, 0
-    goal_scorers = []
     match_events = []
-    
+
     # First half
-    commentary.append(f"🏆 AFRICAN NATIONS LEAGUE: {teamA_name} vs {teamB_name} kicks off!")
-    
-    for minute in range(1, 46):
-        event_occurred = False
-        
+    yield {"kind": "kickoff", "minute": 0, "text": f"🏆 AFRICAN NATIONS LEAGUE: {teamA_name} vs {teamB_name} kicks off!", "scoreA": 0, "scoreB": 0}
+
+    for minute in range(1, MATCH_MINUTES + 1):
         # Team A goal chance
-        if random.random() < goal_prob_a:
+        if rng.random() < goal_prob_a:
             score_a += 1
-            goal_scorers.append({
-                "player": f"Player {random.randint(1, 23)}",
-                "minute": minute,
-                "team": teamA_name
-            })
+            goal = _goal(squads, teamA_name, minute, rng)
             match_events.append(f"Goal for {teamA_name} at {minute}'")
-            event_occurred = True
-        
-        # Team B goal chance  
-        elif random.random() < goal_prob_b:
+            yield {"kind": "goal", "minute": minute, "text": match_events[-1], "goal": goal, "scoreA": score_a, "scoreB": score_b}
+
+        # Team B goal chance
+        elif rng.random() < goal_prob_b:
             score_b += 1
-            goal_scorers.append({
-                "player": f"Player {random.randint(1, 23)}",
-                "minute": minute, 
-                "team": teamB_name
-            })
+            goal = _goal(squads, teamB_name, minute, rng)
             match_events.append(f"Goal for {teamB_name} at {minute}'")
-            event_occurred = True
-        
+            yield {"kind": "goal", "minute": minute, "text": match_events[-1], "goal": goal, "scoreA": score_a, "scoreB": score_b}
+
         # Other match events
-        elif random.random() < 0.05:
-            events = ["Great save!", "Close miss!", "Yellow card!", "Tactical substitution"]
-            match_events.append(f"{random.choice(events)} at {minute}'")
-            event_occurred = True
-    
+        elif rng.random() < OTHER_EVENT_PROB:
+            match_events.append(f"{rng.choice(OTHER_EVENTS)} at {minute}'")
+            yield {"kind": "event", "minute": minute, "text": match_events[-1], "scoreA": score_a, "scoreB": score_b}
+
     # Generate AI commentary based on match events
-    ai_commentary = ai_generator.generate_commentary(teamA_name, teamB_name, match_events)
-    commentary.extend(ai_commentary)
-    
+    for line in ai_generator.generate_commentary(teamA_name, teamB_name, match_events, rng):
+        yield {"kind": "commentary", "minute": MATCH_MINUTES, "text": line, "scoreA": score_a, "scoreB": score_b}
+
+def simulate_match_with_commentary(db, match_id, teamA_name, teamB_name):
+    """Enhanced match simulation with AI commentary"""
+    # Get team ratings for more realistic simulation
+    match = db.matches.find_one({"_id": match_id}) if db is not None else None
+    teamA = db.federations.find_one({"_id": match['teamA_id']} if match.get('teamA_id') else {"country": teamA_name}) if match else None
+    teamB = db.federations.find_one({"_id": match['teamB_id']} if match.get('teamB_id') else {"country": teamB_name}) if match else None
+
+    # Replaying the stored seed regenerates the same result
+    seed = match_seed(match)
+    rng = seeded_rng(seed)
+
+    ratingA = teamA.get('rating', 75) if teamA else 75
+    ratingB = teamB.get('rating', 75) if teamB else 75
+
+    commentary = []
+    score_a, score_b = 0, 0
+    goal_scorers = []
+    squads = get_squad_indexes(db, [teamA_name, teamB_name])
+    for event in iter_match_with_commentary(teamA_name, teamB_name, ratingA, ratingB, rng, squads):
+        score_a, score_b = event["scoreA"], event["scoreB"]
+        if event["kind"] == "goal":
+            goal_scorers.append(event["goal"])
+        elif event["kind"] in ("kickoff", "commentary"):
+            commentary.append(event["text"])
+
     # Update match in database
-    if db:
+    if db is not None:
         db.matches.update_one(
             {"_id": match_id},
             {"$set": {
@@ -71,12 +95,15 @@ def simulate_match_with_commentary(db, match_id, teamA_name, teamB_name):
                 "scoreB": score_b,
                 "goal_scorers": goal_scorers,
                 "commentary": commentary,
-                "method": "played"
+                "method": "played",
+                "seed": seed
             }}
         )
-    
+        apply_match_results(db, [match_id])
+        invalidate_collections("matches", "federations", "players")
+
     # Send email notifications (import here to avoid circular imports)
     from backend.email_service import notify_federations_after_match
-    notify_federations_after_match(match_id)
-    
+    notify_federations_after_match(match_id, {"teamA_name": teamA_name, "teamB_name": teamB_name, "scoreA": score_a, "scoreB": score_b, "goal_scorers": goal_scorers, "method": "played"})
+
     return score_a, score_b, goal_scorers, commentary
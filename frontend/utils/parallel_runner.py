@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from frontend.utils.forecaster import forecast_counts, summarize_counts
+from frontend.utils.match_engine import simulate_matches_batch
+
+DEFAULT_SHARD_SIZE = 10_000
+
+def shard_sizes(total, shard_size=DEFAULT_SHARD_SIZE):
+    """Split total simulations into fixed-size shards (the last one may be smaller)"""
+    sizes = [shard_size] * (total // shard_size)
+    if total % shard_size:
+        sizes.append(total % shard_size)
+    return sizes
+
+def run_sharded(task, total, master_seed=None, shard_size=DEFAULT_SHARD_SIZE, max_workers=None, args=()):
+    """Run task(*args, size, seed_sequence) over shards of total and return the results in shard order.
+
+    Shards and their seeds depend only on total, shard_size and master_seed,
+    never on the number of workers, so a fixed master seed gives the same
+    results whether the shards run in one process or across every core.
+    task must be a module-level function so it can be sent to the workers.
+    """
+    sizes = shard_sizes(total, shard_size)
+    seeds = np.random.SeedSequence(master_seed).spawn(len(sizes))
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(sizes) <= 1:
+        return [task(*args, size, seed) for size, seed in zip(sizes, seeds)]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+        futures = [pool.submit(task, *args, size, seed) for size, seed in zip(sizes, seeds)]
+        return [f.result() for f in futures]
+
+def forecast_shard(state, size, seed):
+    return forecast_counts(state, size, np.random.default_rng(seed))
+
+def parallel_forecast(state, n_sims=1_000_000, master_seed=None, max_workers=None, shard_size=DEFAULT_SHARD_SIZE):
+    """forecaster.forecast_tournament sharded across a process pool"""
+    shards = run_sharded(forecast_shard, n_sims, master_seed, shard_size, max_workers, args=(state,))
+    if not shards or shards[0] is None:
+        return None
+    reach = np.sum([s["reach"] for s in shards], axis=0)
+    return summarize_counts({"teams": shards[0]["teams"], "reach": reach}, n_sims)
+
+def replay_shard(ratings_a, ratings_b, size, seed):
+    """Play every fixture size times and count the outcomes"""
+    rng = np.random.default_rng(seed)
+    ratings_a = np.repeat(np.asarray(ratings_a, dtype=float), size)
+    ratings_b = np.repeat(np.asarray(ratings_b, dtype=float), size)
+    batch = simulate_matches_batch(ratings_a, ratings_b, rng)
+    score_a = batch["scoreA"].reshape(-1, size)
+    score_b = batch["scoreB"].reshape(-1, size)
+    return {
+        "winsA": (score_a > score_b).sum(axis=1),
+        "draws": (score_a == score_b).sum(axis=1),
+        "winsB": (score_a < score_b).sum(axis=1),
+        "goalsA": score_a.sum(axis=1),
+        "goalsB": score_b.sum(axis=1),
+    }
+
+def parallel_match_replays(ratings_a, ratings_b, n_replays, master_seed=None, max_workers=None, shard_size=1_000):
+    """Replay each fixture (ratings_a[i] vs ratings_b[i]) n_replays times across the pool.
+
+    Returns per-fixture outcome counts and goal totals, merged in shard order.
+    """
+    if n_replays < 1:
+        raise ValueError("n_replays must be at least 1")
+    shards = run_sharded(replay_shard, n_replays, master_seed, shard_size, max_workers, args=(ratings_a, ratings_b))
+    return {key: np.sum([s[key] for s in shards], axis=0) for key in shards[0]}
@@ -0,0 +1,88 @@
+"""Rate limiting and admission control for the login and registration paths.
+
+Every attempt must take a token from the bucket of each key it names (the
+email typed in and the browser session) and a slot under a global
+concurrency cap, before it touches the database. Attempts that fail either
+check are turned away in memory, so a burst of submits cannot become a
+burst of database round trips.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# action -> (burst, tokens refilled per second)
+DEFAULT_LIMITS = {"login": (5, 1 / 12), "register": (3, 1 / 60)}
+MAX_CONCURRENT = 8
+MAX_TRACKED_KEYS = 10000
+
+class AdmissionRejected(Exception):
+    """An attempt turned away before any I/O; retry_after is in seconds (0 when the server is busy)"""
+
+    def __init__(self, message, retry_after=0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionControl:
+    """Token buckets per (action, key) plus one semaphore shared by every guarded action"""
+
+    def __init__(self, limits=None, max_concurrent=MAX_CONCURRENT, max_keys=MAX_TRACKED_KEYS, clock=time.monotonic):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_concurrent = max_concurrent
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()  # (action, key) -> [tokens, updated]; least recently used first
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.counters = {action: {"admitted": 0, "rate_limited": 0, "busy": 0} for action in self.limits}
+
+    def _take(self, action, keys):
+        """Take one token from every key's bucket, or none at all; returns seconds to wait (0 when taken)"""
+        burst, rate = self.limits[action]
+        now = self.clock()
+        buckets = []
+        for key in dict.fromkeys(k for k in keys if k):
+            bucket = self._buckets.pop((action, key), None) or [burst, now]
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            self._buckets[(action, key)] = bucket
+            buckets.append(bucket)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        wait = max([(1 - bucket[0]) / rate for bucket in buckets if bucket[0] < 1], default=0)
+        if not wait:
+            for bucket in buckets:
+                bucket[0] -= 1
+        return wait
+
+    @contextmanager
+    def admit(self, action, *keys):
+        """Hold a slot for one attempt keyed by e.g. email and session; raises AdmissionRejected"""
+        # Slot first: an attempt turned away as busy must not cost the user a token
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counters[action]["busy"] += 1
+            raise AdmissionRejected("Server busy - please try again in a moment")
+        with self._lock:
+            wait = self._take(action, keys)
+            if wait:
+                self.counters[action]["rate_limited"] += 1
+            else:
+                self.counters[action]["admitted"] += 1
+                self.in_flight += 1
+        if wait:
+            self._slots.release()
+            raise AdmissionRejected(f"Too many attempts - try again in {math.ceil(wait)}s", wait)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": self.in_flight, "max_concurrent": self.max_concurrent, "tracked_keys": len(self._buckets),
+                    "actions": {action: dict(counts) for action, counts in self.counters.items()}}
@@ -0,0 +1,25 @@
+import hashlib
+import random
+import secrets
+
+def new_seed():
+    """Fresh random seed (fits in a signed 64-bit Mongo integer)"""
+    return secrets.randbits(63)
+
+def derive_seed(parent_seed, *keys):
+    """Child seed for a named stream, e.g. derive_seed(tournament_seed, "quarterfinal", 2).
+
+    Hash based, so the same parent and keys always give the same child and
+    streams for different keys are independent of the order they are used in.
+    """
+    label = ":".join(str(part) for part in (parent_seed,) + keys)
+    return int.from_bytes(hashlib.sha256(label.encode("utf-8")).digest()[:8], "big") >> 1
+
+def seeded_rng(seed):
+    """random.Random with the same API as the random module, for passing as rng="""
+    return random.Random(seed)
+
+def match_seed(match):
+    """The seed stored on a match document, or a new one for matches created before seeding"""
+    seed = match.get("seed") if match else None
+    return seed if seed is not None else new_seed()
@@ -0,0 +1,137 @@
+"""Signed session tokens with an in-process cache of validated sessions.
+
+A login issues a token carrying the user's identity (email, role, country),
+an expiry and an HMAC-SHA256 signature. Page loads resolve the token from an
+LRU of recently validated sessions, so a rerun costs a dictionary lookup
+instead of a users query. A cached session is re-checked against the
+database at most once every revalidate_seconds (one indexed find_one by
+email), which bounds how long a deleted user or changed role goes unnoticed.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+SESSION_TTL_SECONDS = 8 * 3600
+REVALIDATE_SECONDS = 300
+CACHE_SIZE = 1024
+IDENTITY_FIELDS = ("email", "role", "country")
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def identity_of(user):
+    """The fields of a user document a session carries"""
+    return {field: user[field] for field in IDENTITY_FIELDS if user.get(field) is not None}
+
+class SessionStore:
+    """Issues and validates signed tokens; thread-safe and shared by every Streamlit session"""
+
+    def __init__(self, secret, ttl=SESSION_TTL_SECONDS, revalidate_seconds=REVALIDATE_SECONDS, capacity=CACHE_SIZE, clock=time.time):
+        self._key = secret.encode() if isinstance(secret, str) else secret
+        self.ttl = ttl
+        self.revalidate_seconds = revalidate_seconds
+        self.capacity = capacity
+        self.clock = clock
+        self._cache = OrderedDict()  # token -> (claims, last checked against the database)
+        self._revoked = {}  # sid -> exp, so a logged-out token cannot be replayed until it expires
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, user):
+        """A token for a user document (or identity dict), already cached as validated"""
+        now = self.clock()
+        claims = dict(identity_of(user), sid=uuid.uuid4().hex, iat=int(now), exp=int(now + self.ttl))
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        token = f"{payload}.{self._sign(payload)}"
+        self._remember(token, claims, now)
+        return token
+
+    def verify(self, token):
+        """The token's claims if its signature is valid and it has not expired or been revoked, else None"""
+        try:
+            payload, signature = token.split(".")
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except (AttributeError, ValueError):
+            return None
+        if claims.get("exp", 0) <= self.clock() or claims.get("sid") in self._revoked:
+            return None
+        return claims
+
+    def resolve(self, token, load_user=None):
+        """Claims for a token, from memory when possible.
+
+        load_user(email) returns the current user document or None when the
+        user no longer exists; it is only called once revalidate_seconds have
+        passed since the last check. If it raises (database unavailable) the
+        session is kept and checked again on the next resolve.
+        """
+        if not token:
+            return None
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is not None:
+                self._cache.move_to_end(token)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            claims = self.verify(token)
+            if claims is None:
+                return None
+            checked = 0
+        else:
+            claims, checked = entry
+            if claims["exp"] <= now:
+                self.revoke(token)
+                return None
+        if load_user is not None and now - checked >= self.revalidate_seconds:
+            try:
+                user = load_user(claims["email"])
+            except Exception:
+                return claims
+            self.revalidations += 1
+            if user is None or any(user.get(field) != claims.get(field) for field in ("role", "country")):
+                self.revoke(token)
+                return None
+            checked = now
+        self._remember(token, claims, checked)
+        return claims
+
+    def _remember(self, token, claims, checked):
+        with self._lock:
+            self._cache[token] = (claims, checked)
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def revoke(self, token):
+        """Forget a session and refuse its token from now on"""
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.pop(token, None)
+            claims = entry[0] if entry else None
+            self._revoked = {sid: exp for sid, exp in self._revoked.items() if exp > now}
+        claims = claims or self.verify(token)
+        if claims is not None:
+            with self._lock:
+                self._revoked[claims["sid"]] = claims["exp"]
+
+    def stats(self):
+        with self._lock:
+            return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses, "revalidations": self.revalidations}
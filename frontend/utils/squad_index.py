@@ -0,0 +1,92 @@
+import random
+import threading
+from backend.player_store import load_squads
+
+SQUAD_FIELDS = {"country": 1, "name": 1, "naturalPosition": 1, "ratings": 1}
+
+class AliasSampler:
+    """Walker's alias method: O(n) setup, then O(1) weighted draws"""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def draw(self, rng=None):
+        rng = rng or random
+        i = int(rng.random() * len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+def _weight(player, position):
+    # Every player keeps a small chance, even out of position
+    return max(player.get("ratings", {}).get(position, 0), 1)
+
+class SquadIndex:
+    """Outfield players of one squad with rating-weighted scorer and assister samplers"""
+
+    def __init__(self, players):
+        outfield_players = [p for p in players if p.get("naturalPosition") != "GK"]
+        self.outfield = [p.get("name") for p in outfield_players]
+        # Player ids let stats land on the right document when two players share a name
+        self.ids = [p.get("_id") for p in outfield_players]
+        self.scorers = AliasSampler([_weight(p, "AT") for p in outfield_players]) if outfield_players else None
+        self.assisters = AliasSampler([_weight(p, "MD") for p in outfield_players]) if len(outfield_players) > 1 else None
+
+    def goal_event(self, team_name, minute, rng=None, assist_chance=0.7):
+        """Goal dict in the match document format, with scorer and assist picked from the index"""
+        rng = rng or random
+        if self.scorers is None:
+            return {"player": f"Player {rng.randint(1, 23)}", "minute": minute, "team": team_name, "assist": "Unassisted"}
+        scorer = self.scorers.draw(rng)
+        goal = {"player": self.outfield[scorer], "minute": minute, "team": team_name, "assist": "Solo goal"}
+        if self.ids[scorer] is not None:
+            goal["player_id"] = self.ids[scorer]
+        if self.assisters is not None and rng.random() < assist_chance:
+            assister = self.assisters.draw(rng)
+            while assister == scorer:
+                assister = self.assisters.draw(rng)
+            goal["assist"] = f"Assist: {self.outfield[assister]}"
+            if self.ids[assister] is not None:
+                goal["assist_id"] = self.ids[assister]
+        return goal
+
+_squads = {}
+_squads_lock = threading.Lock()
+
+def get_squad_index(db, country):
+    """Squad index for a country, loaded from the players collection on first use only"""
+    with _squads_lock:
+        index = _squads.get(country)
+    if index is None:
+        index = get_squad_indexes(db, [country])[country]
+    return index
+
+def get_squad_indexes(db, countries):
+    """Squad indexes for several countries, loading every uncached squad in one query"""
+    with _squads_lock:
+        found = {c: _squads[c] for c in countries if c in _squads}
+    missing = [c for c in countries if c not in found]
+    if missing:
+        players = load_squads(db, missing, SQUAD_FIELDS)
+        with _squads_lock:
+            for country, squad in players.items():
+                found[country] = _squads.setdefault(country, SquadIndex(squad))
+    return found
+
+def invalidate_squad(country=None):
+    """Drop the cached index for a country (or all of them) after its squad changes"""
+    with _squads_lock:
+        if country is None:
+            _squads.clear()
+        else:
+            _squads.pop(country, None)
@@ -0,0 +1,90 @@
+from frontend.utils.forecaster import STAGES, BRACKET_SIZE, DEFAULT_RATING
+from frontend.utils.match_engine import simulate_goal_minutes
+from frontend.utils.seeding import derive_seed, seeded_rng, match_seed
+from frontend.utils.squad_index import SquadIndex
+
+# Same assist chance as Quick Simulate
+ASSIST_CHANCE = 0.6
+
+def match_winner(match):
+    """Bracket rule used by create_semifinals/create_final: a draw sends team B through"""
+    return match["teamA_name"] if match["scoreA"] > match["scoreB"] else match["teamB_name"]
+
+def new_match(team_a, team_b, stage, seed):
+    return {"teamA_name": team_a, "teamB_name": team_b, "stage": stage, "status": "scheduled", "scoreA": 0, "scoreB": 0, "seed": seed}
+
+def draw_quarterfinals(countries, tournament_seed):
+    """Quarter-final documents drawn like initialize_tournament"""
+    teams = list(countries[:BRACKET_SIZE])
+    seeded_rng(derive_seed(tournament_seed, "draw")).shuffle(teams)
+    return [new_match(teams[i], teams[i + 1], "quarterfinal", derive_seed(tournament_seed, "quarterfinal", i // 2))
+            for i in range(0, len(teams), 2)]
+
+def next_round(completed, tournament_seed):
+    """Documents for the round after a completed stage, like create_semifinals/create_final"""
+    stage = STAGES[STAGES.index(completed[0]["stage"]) + 1]
+    winners = [match_winner(m) for m in completed]
+    return [new_match(winners[i], winners[i + 1], stage, derive_seed(tournament_seed, stage, i // 2))
+            for i in range(0, len(winners), 2)]
+
+def play_match(match, ratings, squads, engine="classic"):
+    """Play one scheduled match in memory and return the fields to set on it"""
+    seed = match_seed(match)
+    rng = seeded_rng(seed)
+    team_a, team_b = match["teamA_name"], match["teamB_name"]
+    minutes_a, minutes_b = simulate_goal_minutes(engine, ratings.get(team_a, DEFAULT_RATING), ratings.get(team_b, DEFAULT_RATING), rng)
+
+    squad_a = squads.get(team_a) or SquadIndex([])
+    squad_b = squads.get(team_b) or SquadIndex([])
+    goal_scorers = [squad_a.goal_event(team_a, minute, rng, ASSIST_CHANCE) for minute in minutes_a]
+    goal_scorers += [squad_b.goal_event(team_b, minute, rng, ASSIST_CHANCE) for minute in minutes_b]
+    goal_scorers.sort(key=lambda g: g["minute"])
+
+    return {"status": "completed", "scoreA": len(minutes_a), "scoreB": len(minutes_b), "goal_scorers": goal_scorers,
+            "method": "simulated", "engine": engine, "seed": seed}
+
+def play_remaining(matches, ratings, squads, engine, tournament_seed):
+    """Play every scheduled match and create/play the later rounds, all in memory.
+
+    matches are the current bracket documents in creation order. Returns
+    (results, created, stage): results maps the index of each existing match
+    that was played to its completed fields, created lists the new round
+    documents (already played, when possible) and stage is the last stage
+    reached.
+    """
+    results = {}
+    created = []
+    rounds = {stage: [] for stage in STAGES}
+    for i, m in enumerate(matches):
+        if m.get("stage") in rounds:
+            rounds[m["stage"]].append((i, m))
+
+    stage = None
+    for stage_index, stage_name in enumerate(STAGES):
+        if not rounds[stage_name]:
+            break
+        stage = stage_name
+        played = []
+        for i, m in rounds[stage_name]:
+            if m.get("status") != "completed":
+                fields = play_match(m, ratings, squads, engine)
+                if i is None:
+                    m.update(fields)
+                else:
+                    results[i] = fields
+                m = dict(m, **fields)
+            played.append(m)
+
+        if stage_index + 1 < len(STAGES) and not rounds[STAGES[stage_index + 1]]:
+            following = next_round(played, tournament_seed)
+            created.extend(following)
+            rounds[STAGES[stage_index + 1]] = [(None, m) for m in following]
+    return results, created, stage
+
+def play_tournament(countries, ratings, squads, engine="classic", tournament_seed=0):
+    """Draw and play a full tournament; returns all match documents in creation order"""
+    quarters = draw_quarterfinals(countries, tournament_seed)
+    results, created, _ = play_remaining(quarters, ratings, squads, engine, tournament_seed)
+    for i, fields in results.items():
+        quarters[i].update(fields)
+    return quarters + created
@@ -0,0 +1,67 @@
+"""The fast engines against the per-minute loop they replace.
+
+Seeded, so the runs are reproducible; the tolerances are about four
+standard errors at this many matches. Needs pytest and numpy.
+"""
+import random
+import numpy as np
+import pytest
+
+from frontend.utils.match_engine import MATCH_MINUTES, minute_loop_goal_minutes, sample_goal_minutes, sample_scores_batch, simulate_matches_batch
+
+N_MATCHES = 20_000
+GOALS_TOLERANCE = 0.08
+SHARE_TOLERANCE = 0.02
+FIXTURES = [(75, 75), (90, 60), (55, 80)]
+
+def summary(score_a, score_b):
+    """Mean goals per side and the win/draw/loss shares for team A"""
+    score_a, score_b = np.asarray(score_a), np.asarray(score_b)
+    return {
+        "goalsA": score_a.mean(),
+        "goalsB": score_b.mean(),
+        "win": (score_a > score_b).mean(),
+        "draw": (score_a == score_b).mean(),
+        "loss": (score_a < score_b).mean(),
+    }
+
+def minute_loop(rating_a, rating_b, seed):
+    rng = random.Random(seed)
+    scores = [minute_loop_goal_minutes(rating_a, rating_b, rng) for _ in range(N_MATCHES)]
+    return summary([len(a) for a, _ in scores], [len(b) for _, b in scores])
+
+def assert_close(actual, expected):
+    for key in ("goalsA", "goalsB"):
+        assert actual[key] == pytest.approx(expected[key], abs=GOALS_TOLERANCE), key
+    for key in ("win", "draw", "loss"):
+        assert actual[key] == pytest.approx(expected[key], abs=SHARE_TOLERANCE), key
+
+@pytest.mark.parametrize("rating_a,rating_b", FIXTURES)
+def test_vectorized_engine_matches_minute_loop(rating_a, rating_b):
+    batch = simulate_matches_batch(np.full(N_MATCHES, rating_a), np.full(N_MATCHES, rating_b), np.random.default_rng(1))
+    assert_close(summary(batch["scoreA"], batch["scoreB"]), minute_loop(rating_a, rating_b, seed=2))
+
+@pytest.mark.parametrize("rating_a,rating_b", FIXTURES)
+def test_score_sampling_matches_minute_loop(rating_a, rating_b):
+    score_a, score_b = sample_scores_batch(np.full(N_MATCHES, rating_a), np.full(N_MATCHES, rating_b), np.random.default_rng(3))
+    assert_close(summary(score_a, score_b), minute_loop(rating_a, rating_b, seed=4))
+
+@pytest.mark.parametrize("rating_a,rating_b", FIXTURES)
+def test_direct_sampling_matches_minute_loop(rating_a, rating_b):
+    rng = random.Random(5)
+    scores = [sample_goal_minutes(rating_a, rating_b, rng) for _ in range(N_MATCHES)]
+    assert_close(summary([len(a) for a, _ in scores], [len(b) for _, b in scores]), minute_loop(rating_a, rating_b, seed=6))
+
+def test_batch_goals_never_share_a_minute():
+    batch = simulate_matches_batch(np.full(500, 90), np.full(500, 90), np.random.default_rng(7))
+    assert not (batch["goalsA"] & batch["goalsB"]).any()
+    assert batch["goalsA"].shape == (500, MATCH_MINUTES)
+    np.testing.assert_array_equal(batch["scoreA"], batch["goalsA"].sum(axis=1))
+
+def test_direct_sampling_minutes_are_distinct_and_in_range():
+    rng = random.Random(8)
+    for _ in range(2_000):
+        goals_a, goals_b = sample_goal_minutes(95, 95, rng)
+        minutes = goals_a + goals_b
+        assert len(set(minutes)) == len(minutes)
+        assert all(1 <= m <= MATCH_MINUTES for m in minutes)
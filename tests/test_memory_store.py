@@ -0,0 +1,233 @@
+"""The memory engine checked against mongomock on the same operations.
+
+Needs pytest and mongomock (pip install pytest mongomock); skipped otherwise.
+"""
+import itertools
+import pytest
+from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+mongomock = pytest.importorskip("mongomock")
+
+from backend.memory_store import MemoryClient
+from backend.data_generator import generate
+from backend.stats_projector import apply_match_results
+from frontend.utils import analytics
+
+_names = itertools.count()
+
+@pytest.fixture
+def dbs():
+    """A fresh (memory, mongomock) database pair"""
+    return MemoryClient.for_uri(f"memory://test-{next(_names)}")["db"], mongomock.MongoClient()["db"]
+
+@pytest.fixture(scope="module")
+def leagues():
+    """The same synthetic league, results applied, in both engines"""
+    pair = MemoryClient.for_uri("memory://test-league")["db"], mongomock.MongoClient()["db"]
+    for db in pair:
+        generate(db, 12, 150, seed=3, batch_size=50, log=lambda *args: None)
+        apply_match_results(db)
+    return pair
+
+DOCUMENTS = [
+    {"_id": 1, "name": "Ade", "goals": 3, "country": "Nigeria", "tags": ["fast", "left"], "ratings": {"AT": 80, "DF": 20}},
+    {"_id": 2, "name": "Bola", "goals": 0, "country": "Nigeria", "tags": ["tall"], "ratings": {"AT": 40, "DF": 75}},
+    {"_id": 3, "name": "Kofi", "goals": 5, "country": "Ghana", "tags": [], "ratings": {"AT": 88, "DF": 10}, "isCaptain": True},
+    {"_id": 4, "name": "kwame", "goals": 1, "country": "Ghana", "ratings": {"AT": 60, "DF": 60}, "note": None},
+    {"_id": 5, "name": "Said", "goals": 2, "country": "Egypt", "tags": ["left", "tall"], "ratings": {"AT": 70, "DF": 30}},
+]
+
+FILTERS = [
+    {},
+    {"country": "Ghana"},
+    {"goals": {"$gt": 1}},
+    {"goals": {"$gte": 1, "$lt": 5}},
+    {"country": {"$in": ["Egypt", "Ghana"]}},
+    {"country": {"$nin": ["Egypt", "Ghana"]}},
+    {"goals": {"$ne": 0}},
+    {"isCaptain": {"$exists": True}},
+    {"tags": {"$exists": False}},
+    {"note": None},
+    {"tags": "left"},
+    {"tags": {"$all": ["left", "tall"]}},
+    {"tags": {"$size": 0}},
+    {"ratings.AT": {"$gte": 70}},
+    {"$or": [{"country": "Egypt"}, {"goals": 0}]},
+    {"$and": [{"country": "Nigeria"}, {"goals": {"$gt": 0}}]},
+    {"$nor": [{"country": "Nigeria"}, {"goals": {"$gt": 2}}]},
+    {"goals": {"$not": {"$gt": 1}}},
+    {"name": {"$regex": "^k", "$options": "i"}},
+    {"tags.0": {"$exists": True}},
+]
+
+def without_object_ids(value):
+    """value minus generated ObjectIds, at any depth, since they differ between the two engines"""
+    if isinstance(value, dict):
+        return {k: without_object_ids(v) for k, v in value.items() if not isinstance(v, ObjectId)}
+    if isinstance(value, (list, tuple)) or hasattr(value, "__next__"):
+        return [without_object_ids(v) for v in value]
+    return value
+
+def ids(documents):
+    return sorted(document["_id"] for document in documents)
+
+@pytest.mark.parametrize("query", FILTERS)
+def test_filters(dbs, query):
+    memory, mock = dbs
+    for db in dbs:
+        db.players.insert_many([dict(document) for document in DOCUMENTS])
+    assert ids(memory.players.find(query)) == ids(mock.players.find(query))
+    assert memory.players.count_documents(query) == mock.players.count_documents(query)
+
+INDEXED_FILTERS = FILTERS + [
+    {"country": "Ghana", "goals": {"$gt": 1}},
+    {"country": {"$eq": "Egypt"}},
+    {"_id": {"$in": [5, 1, 9]}},
+    {"goals": 1.0},
+    {"tags": {"$in": ["tall", "none"]}},
+]
+
+@pytest.mark.parametrize("query", INDEXED_FILTERS)
+def test_indexed_filters(dbs, query):
+    memory, mock = dbs
+    for db in dbs:
+        for field in ("country", "goals", "tags", "note", "ratings.AT"):
+            db.players.create_index(field)
+        db.players.insert_many([dict(document) for document in DOCUMENTS])
+    # Natural order too, not just the same set
+    assert [d["_id"] for d in memory.players.find(query)] == [d["_id"] for d in mock.players.find(query)]
+
+def test_lookups_follow_writes(dbs):
+    memory, mock = dbs
+    for db in dbs:
+        db.players.create_index([("country", 1), ("name", 1)])
+        db.players.insert_many([dict(document) for document in DOCUMENTS])
+        db.players.update_many({"country": "Ghana"}, {"$set": {"country": "Togo"}})
+        db.players.replace_one({"_id": 5}, {"name": "Said", "country": "Togo"})
+        db.players.delete_one({"name": "Ade"})
+        db.players.insert_one({"_id": 6, "name": "Ade", "country": "Nigeria"})
+    for query in ({"country": "Ghana"}, {"country": "Togo"}, {"country": "Nigeria"}, {"name": "Ade"}, {"country": "Egypt"}):
+        assert [d["_id"] for d in memory.players.find(query)] == [d["_id"] for d in mock.players.find(query)]
+    # An indexed equality only visits its own bucket
+    assert memory.players._candidates({"country": "Togo", "goals": {"$gt": 0}}) == {3, 4, 5}
+    assert memory.players._candidates({"goals": 5}) is None
+    memory.players.drop_index("country_1_name_1")
+    assert memory.players._candidates({"country": "Togo"}) is None
+
+def test_sort_skip_limit_and_projection(dbs):
+    memory, mock = dbs
+    for db in dbs:
+        db.players.insert_many([dict(document) for document in DOCUMENTS])
+    for projection in ({"name": 1, "goals": 1}, {"_id": 0, "name": 1}, {"ratings": 0, "tags": 0}, {"ratings.AT": 1}):
+        expected = list(mock.players.find({}, projection).sort([("country", 1), ("goals", -1)]).skip(1).limit(3))
+        assert list(memory.players.find({}, projection).sort([("country", 1), ("goals", -1)]).skip(1).limit(3)) == expected
+
+UPDATES = [
+    {"$set": {"goals": 9, "ratings.GK": 5}},
+    {"$inc": {"goals": 2, "assists": 1}},
+    {"$unset": {"ratings.DF": "", "tags": ""}},
+    {"$push": {"tags": "new"}},
+    {"$push": {"tags": {"$each": ["a", "b"]}}},
+    {"$addToSet": {"tags": "left"}},
+    {"$pull": {"tags": "left"}},
+    {"$min": {"goals": 1}},
+    {"$max": {"goals": 4}},
+]
+
+@pytest.mark.parametrize("update", UPDATES)
+def test_update_operators(dbs, update):
+    memory, mock = dbs
+    for db in dbs:
+        db.players.insert_many([dict(document) for document in DOCUMENTS if "tags" in document])
+        db.players.update_many({"goals": {"$lt": 4}}, update)
+    assert list(memory.players.find().sort("_id", 1)) == list(mock.players.find().sort("_id", 1))
+
+def test_upserts(dbs):
+    memory, mock = dbs
+    results = []
+    for db in dbs:
+        inserted = db.federations.update_one({"country": "Ghana", "points": {"$gte": 0}}, {"$set": {"manager": "A"}, "$setOnInsert": {"points": 0}}, upsert=True)
+        matched = db.federations.update_one({"country": "Ghana"}, {"$inc": {"points": 3}, "$setOnInsert": {"manager": "B"}}, upsert=True)
+        results.append((inserted.matched_count, inserted.upserted_id is not None, matched.matched_count, matched.upserted_id))
+    assert results[0] == results[1]
+    assert list(memory.federations.find({}, {"_id": 0})) == list(mock.federations.find({}, {"_id": 0}))
+
+def test_find_one_and_update(dbs):
+    memory, mock = dbs
+    for db in dbs:
+        db.outbox.insert_many([{"_id": i, "status": "pending", "at": 10 - i} for i in range(3)])
+    for return_document in (ReturnDocument.BEFORE, ReturnDocument.AFTER):
+        kwargs = dict(sort=[("at", 1)], projection={"status": 1}, return_document=return_document)
+        expected = mock.outbox.find_one_and_update({"status": "pending"}, {"$set": {"status": "sending"}}, **kwargs)
+        assert memory.outbox.find_one_and_update({"status": "pending"}, {"$set": {"status": "sending"}}, **kwargs) == expected
+
+def test_unique_indexes():
+    db = MemoryClient.for_uri(f"memory://test-{next(_names)}")["db"]
+    db.users.create_index("email", unique=True)
+    db.users.insert_one({"email": "a@x"})
+    with pytest.raises(DuplicateKeyError):
+        db.users.insert_one({"email": "a@x"})
+    db.users.insert_one({"email": "b@x"})
+    with pytest.raises(DuplicateKeyError):
+        db.users.update_one({"email": "b@x"}, {"$set": {"email": "a@x"}})
+    db.users.delete_one({"email": "a@x"})
+    db.users.update_one({"email": "b@x"}, {"$set": {"email": "a@x"}})
+    assert db.users.count_documents({"email": "a@x"}) == 1
+
+def test_sparse_unique_index_and_unordered_insert(dbs):
+    memory, mock = dbs
+    outcomes = []
+    for db in dbs:
+        db.outbox.create_index("dedupe_key", unique=True, sparse=True)
+        db.outbox.insert_many([{"n": 1}, {"n": 2}])  # missing keys never collide
+        with pytest.raises(BulkWriteError) as error:
+            db.outbox.insert_many([{"dedupe_key": "a"}, {"dedupe_key": "a"}, {"dedupe_key": "b"}], ordered=False)
+        outcomes.append((error.value.details["nInserted"], [e["code"] for e in error.value.details["writeErrors"]], db.outbox.count_documents({})))
+    assert outcomes[0] == outcomes[1] == (2, [11000], 4)
+
+def test_bulk_write(dbs):
+    memory, mock = dbs
+    operations = [InsertOne({"_id": 1, "x": 1}), UpdateOne({"x": 1}, {"$set": {"y": 2}}), UpdateOne({"x": 9}, {"$set": {"y": 3}}, upsert=True), DeleteOne({"x": 9})]
+    results = []
+    for db in dbs:
+        result = db.matches.bulk_write(operations)
+        results.append((result.inserted_count, result.matched_count, result.modified_count, result.upserted_count, result.deleted_count))
+    assert results[0] == results[1]
+    assert list(memory.matches.find()) == list(mock.matches.find())
+
+@pytest.mark.parametrize("pipeline", [
+    analytics.top_scorers_pipeline(),
+    analytics.top_assisters_pipeline(),
+    analytics.goals_per_stage_pipeline(),
+    analytics.completed_count_pipeline(),
+    analytics.match_history_pipeline(1, 5),
+], ids=["scorers", "assisters", "stages", "count", "history"])
+def test_analytics_pipelines(leagues, pipeline):
+    memory, mock = leagues
+    expected = without_object_ids(mock.matches.aggregate(pipeline))
+    assert expected and without_object_ids(memory.matches.aggregate(pipeline)) == expected
+
+def test_team_records_pipeline(leagues):
+    # mongomock cannot evaluate array literals in $project, so tally the records in Python instead
+    memory, _ = leagues
+    expected = {}
+    for match in memory.matches.find({"status": "completed"}):
+        for team, scored, conceded in ((match["teamA_name"], match["scoreA"], match["scoreB"]), (match["teamB_name"], match["scoreB"], match["scoreA"])):
+            row = expected.setdefault(team, {"played": 0, "wins": 0, "draws": 0, "losses": 0, "goalsFor": 0, "goalsAgainst": 0})
+            row["played"] += 1
+            row["wins" if scored > conceded else "draws" if scored == conceded else "losses"] += 1
+            row["goalsFor"] += scored
+            row["goalsAgainst"] += conceded
+    records = {row["_id"]: {k: row[k] for k in ("played", "wins", "draws", "losses", "goalsFor", "goalsAgainst")} for row in memory.matches.aggregate(analytics.team_records_pipeline())}
+    assert records == expected
+
+def test_projected_stats_match(leagues):
+    memory, mock = leagues
+    sort = [("points", -1), ("goalsFor", -1), ("country", 1)]
+    fields = {"_id": 0, "country": 1, "points": 1, "wins": 1, "draws": 1, "losses": 1, "goalsFor": 1, "goalsAgainst": 1}
+    assert list(memory.federations.find({}, fields).sort(sort)) == list(mock.federations.find({}, fields).sort(sort))
+    fields = {"_id": 0, "country": 1, "name": 1, "jerseyNumber": 1, "goals": 1, "assists": 1}
+    sort = [("goals", -1), ("country", 1), ("jerseyNumber", 1)]
+    assert list(memory.players.find({"goals": {"$gt": 0}}, fields).sort(sort)) == list(mock.players.find({"goals": {"$gt": 0}}, fields).sort(sort))
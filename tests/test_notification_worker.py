@@ -0,0 +1,123 @@
+"""The outbox worker against the memory engine, with a stub SMTP session.
+
+Needs pytest (pip install pytest).
+"""
+import itertools
+import time
+from datetime import datetime, timedelta
+import pytest
+
+from backend.index_manager import ensure_indexes
+from backend.memory_store import MemoryClient
+from backend.notification_worker import FAILED, OUTBOX, PENDING, SENT, OutboxWorker, digest_message, enqueue_messages
+
+_names = itertools.count()
+
+class StubSession:
+    """Records what it is asked to send; raises for the next `failures` sends"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+        self.closed = 0
+
+    def send(self, document):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("stub SMTP down")
+        self.sent.append(document)
+
+    def close_if_idle(self, idle_seconds=0):
+        pass
+
+    def close(self):
+        self.closed += 1
+
+@pytest.fixture
+def db():
+    db = MemoryClient.for_uri(f"memory://outbox-{next(_names)}")["db"]
+    ensure_indexes(db)
+    return db
+
+def message(n, **extra):
+    return dict({"to": f"fed{n}@example.com", "subject": f"Result {n}", "body": f"Body {n}"}, **extra)
+
+def worker_for(db, **kwargs):
+    return OutboxWorker(lambda: db, StubSession, combine=digest_message, **kwargs)
+
+def statuses(db):
+    return [d["status"] for d in db[OUTBOX].find({}).sort("created_at", 1)]
+
+def test_delivers_and_marks_sent(db):
+    assert enqueue_messages(db, [message(n) for n in range(3)]) == 3
+    session = StubSession()
+    assert worker_for(db).drain(session) == 3
+    assert [d["to"] for d in session.sent] == [f"fed{n}@example.com" for n in range(3)]
+    assert statuses(db) == [SENT] * 3
+    # The lease is released once the outcome is recorded
+    assert db[OUTBOX].count_documents({"claim": {"$exists": True}}) == 0
+
+def test_failed_send_is_retried_with_backoff(db):
+    enqueue_messages(db, [message(1)])
+    worker = worker_for(db, base_retry=60)
+    session = StubSession(failures=1)
+    worker.drain(session)
+
+    document = db[OUTBOX].find_one({})
+    assert document["status"] == PENDING
+    assert document["attempts"] == 1
+    assert document["last_error"] == "stub SMTP down"
+    assert document["next_attempt_at"] > datetime.utcnow() + timedelta(seconds=30)
+    assert session.closed >= 1
+    # Not due yet, so a second pass leaves it alone
+    assert worker.drain(StubSession()) == 0
+
+    db[OUTBOX].update_one({}, {"$set": {"next_attempt_at": datetime.utcnow()}})
+    retry = StubSession()
+    assert worker.drain(retry) == 1
+    assert [d["subject"] for d in retry.sent] == ["Result 1"]
+    assert statuses(db) == [SENT]
+
+def test_gives_up_after_max_attempts(db):
+    enqueue_messages(db, [message(1)])
+    worker = worker_for(db, max_attempts=2, base_retry=0)
+    worker.drain(StubSession(failures=5))
+    worker.drain(StubSession(failures=5))
+    document = db[OUTBOX].find_one({})
+    assert (document["status"], document["attempts"]) == (FAILED, 2)
+    assert worker.failed == 1
+
+def test_digest_group_goes_out_as_one_email(db):
+    enqueue_messages(db, [message(1, digest="results"), dict(message(1, digest="results"), body="Body 2"), message(2)])
+    session = StubSession()
+    worker_for(db).drain(session)
+    assert len(session.sent) == 2
+    digest = next(d for d in session.sent if d["to"] == "fed1@example.com")
+    assert digest["body"] == "Body 1\n\nBody 2"
+    assert db[OUTBOX].count_documents({"status": SENT, "sent_in_digest": True}) == 2
+
+def test_dedupe_key_queues_once(db):
+    assert enqueue_messages(db, [message(1, dedupe_key="match-1:fed1")]) == 1
+    assert enqueue_messages(db, [message(1, dedupe_key="match-1:fed1"), message(2, dedupe_key="match-1:fed2")]) == 1
+    assert db[OUTBOX].count_documents({}) == 2
+
+def test_no_database_means_no_work():
+    worker = OutboxWorker(lambda: None, StubSession)
+    assert worker.drain(StubSession()) == 0
+
+def test_background_workers_deliver_after_notify(db):
+    sessions = []
+    def factory():
+        sessions.append(StubSession())
+        return sessions[-1]
+    worker = OutboxWorker(lambda: db, factory, workers=2, poll_seconds=30).start()
+    try:
+        enqueue_messages(db, [message(n) for n in range(5)])
+        worker.notify()
+        deadline = time.monotonic() + 5
+        while db[OUTBOX].count_documents({"status": SENT}) < 5 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        worker.stop()
+    assert statuses(db) == [SENT] * 5
+    assert sorted(d["subject"] for s in sessions for d in s.sent) == [f"Result {n}" for n in range(5)]
@@ -0,0 +1,47 @@
+"""The sharded runners give the same numbers for any worker count.
+
+Needs pytest and numpy (pip install pytest numpy).
+"""
+import numpy as np
+import pytest
+
+from frontend.utils.forecaster import build_bracket_state
+from frontend.utils.parallel_runner import parallel_forecast, parallel_match_replays, shard_sizes
+
+TEAMS = [{"country": f"Team {i}", "rating": 60 + 4 * i} for i in range(8)]
+
+def test_shard_sizes_cover_the_total():
+    assert shard_sizes(25, 10) == [10, 10, 5]
+    assert shard_sizes(20, 10) == [10, 10]
+    assert shard_sizes(0, 10) == []
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_forecast_matches_single_process(workers):
+    state = build_bracket_state(TEAMS, [])
+    serial = parallel_forecast(state, 5_000, master_seed=7, max_workers=1, shard_size=1_000)
+    parallel = parallel_forecast(state, 5_000, master_seed=7, max_workers=workers, shard_size=1_000)
+    assert parallel == serial
+    assert sum(row["champion"] for row in serial["teams"]) == pytest.approx(1)
+
+def test_forecast_depends_on_the_seed():
+    state = build_bracket_state(TEAMS, [])
+    first = parallel_forecast(state, 4_000, master_seed=1, max_workers=1, shard_size=1_000)
+    second = parallel_forecast(state, 4_000, master_seed=2, max_workers=1, shard_size=1_000)
+    assert first != second
+
+def test_forecast_without_a_full_bracket():
+    assert parallel_forecast(build_bracket_state(TEAMS[:5], []), 2_000, master_seed=1, max_workers=2, shard_size=1_000) is None
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_replays_match_single_process(workers):
+    ratings_a, ratings_b = [70, 85, 60], [80, 65, 60]
+    serial = parallel_match_replays(ratings_a, ratings_b, 3_500, master_seed=11, max_workers=1)
+    parallel = parallel_match_replays(ratings_a, ratings_b, 3_500, master_seed=11, max_workers=workers)
+    assert serial.keys() == parallel.keys()
+    for key in serial:
+        np.testing.assert_array_equal(parallel[key], serial[key])
+    np.testing.assert_array_equal(serial["winsA"] + serial["draws"] + serial["winsB"], [3_500] * 3)
+
+def test_replays_need_at_least_one():
+    with pytest.raises(ValueError):
+        parallel_match_replays([70], [70], 0)